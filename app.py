@@ -1,95 +1,200 @@
 import streamlit as st
-import yaml, requests, re, os, json
+import yaml, os, time
 import pandas as pd
 from st_aggrid import AgGrid, GridUpdateMode, JsCode
 from st_aggrid.grid_options_builder import GridOptionsBuilder
 from streamlit_echarts import st_echarts
+from payout.calculator import payout_calculator, ingest_stamp
+from payout import snapshot
+from payout.cube import payout_cube
+from payout import charts
+from payout.table import table_index
+from payout.timeline import payout_timeline
+from payout.manager import snapshot_manager
+from payout import timing
+from payout import currency
+from payout import api
+from payout import scenario
+from payout.history import stored, HISTORY_DIR
 
-class payout_calculator():
-    """
-        Calculate the total flipside payout from README.md, and tabulate it based on blockchains category
-    """
-    def __init__(self, yml_f, trk_f):
-        self.curr_chain = None 
-        self.curr_year  = None
-        self.decode_yaml(yml_f)
-        d = self.parse_in_f(trk_f)
-        df = self.dataframe(d)
-        if os.path.isdir('data') == False:
-            os.mkdir('data')
-        df.to_csv('data/payout.csv', encoding='utf-8', index=False)
+REFRESH_WAIT = 60 # seconds a drawn page waits for the background refresh before it is left to the next rerun
+REFRESH_SLICE = 0.25 # seconds between two checks while waiting, a widget change stops the wait there
 
-    def decode_yaml(self, yml_f):
-        with open(yml_f, 'r') as stream:
-            try:
-                self.parsed_yaml = yaml.safe_load(stream)
-            except yaml.YAMLError as exc:
-                print (exc)
+# ---- STREAMLIT RENDER ---- #
+# partial reruns where streamlit supports them, so the table filters only rerun the table
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda f: f)
 
-    def parse_in_f(self, trk_f):
-        self.blockchain_lst = list(self.parsed_yaml['blockchain-list'].keys())
-        years = self.parsed_yaml['year']
-        d = dict()
-        for year in years:
-            d[year] = {}
-            for chain in self.blockchain_lst:
-                d[year][chain] = {}
-                for denom in self.parsed_yaml['blockchain-list'][chain]:
-                    d[year][chain][denom] = {}
-                    d[year][chain][denom]['amount'] = 0
-                    d[year][chain][denom]['price'] = self.get_price(self.parsed_yaml['API'][denom])
-        
-        # Read line by line
-        with open(trk_f, 'r', encoding="utf8") as fp:
-            for line in fp:
-                # set current chain
-                for n in range(0, len(self.blockchain_lst)):
-                    if re.match(f".+{self.blockchain_lst[n]} Bounties+.", line):
-                        self.curr_chain = self.blockchain_lst[n]
-             
-                # set current year
-                for n in range(0, len(years)):
-                    if re.match(f"^## +{years[n]}", line):
-                        self.curr_year = years[n]
-                
-                # the rest of the README's table element
-                if re.match(f"^\|.(✅)", line):
-                    for denom in self.parsed_yaml['blockchain-list'][self.curr_chain]:
-                        payout = re.findall(f"((\d+\.\d+)|\d+)(?=\s*{denom})", line)
-                        if len(payout) != 0:
-                            value = float(payout[0][0])
-                            d[self.curr_year][self.curr_chain][denom]['amount'] += value
-        return d
-    
-    def dataframe(self, d):
-        data = list()
-        for year in d.keys():
-            for chain in self.blockchain_lst:
-                for denom in self.parsed_yaml['blockchain-list'][chain]:
-                    data.append([year, chain, denom, d[year][chain][denom]['amount'], "{:.2f}".format(d[year][chain][denom]['price']), "{:.2f}".format(d[year][chain][denom]['amount']*d[year][chain][denom]['price'])])
-        df = pd.DataFrame(data,columns=['Year','Blockchain','Tokens','Amount','Price','Amount_USD'])
-        return df
+@fragment
+def income_table(index, cur='USD'):
+    ## Filter Year
+    year = st.multiselect(
+        "Select the Year:",
+        index.options('Year'),
+        index.options('Year')
+    )
+    ## Filter Blockchain
+    blockchain = st.multiselect(
+        "Select the Blockchain:",
+        index.options('Blockchain'),
+        index.options('Blockchain')
+    )
+    ## Filter Contributor, with a folder of trackers
+    contributor = index.options('Contributor')
+    if len(contributor) > 1:
+        contributor = st.multiselect(
+            "Select the Contributor:",
+            contributor,
+            contributor
+        )
+    ## Sort and page on the server, the grid only gets the rows of one page
+    col1, col2, col3, col4 = st.columns(4)
+    amount_cur = f"Amount_{cur}" # the Amount_USD column, in the selected currency
+    sort_by = col1.selectbox("Sort by:", ['-', 'Amount', 'Price', amount_cur])
+    sort_by = 'Amount_USD' if sort_by == amount_cur else sort_by
+    order = col2.selectbox("Order:", ['Descending', 'Ascending'])
+    page_size = col3.selectbox("Page size:", [10, 25, 50, 100])
+    rows = index.select(
+        sort_by=None if sort_by == '-' else sort_by,
+        ascending=order == 'Ascending',
+        Year=year,
+        Blockchain=blockchain,
+        Contributor=contributor
+    )
+    pages = index.page_count(rows, page_size)
+    page = col4.number_input("Page:", min_value=1, max_value=pages, value=1, step=1)
+    df_selection = index.page(rows, int(page) - 1, page_size).rename(columns={'Amount_USD': amount_cur})
+    st.caption(f"{len(rows)} rows, page {min(int(page), pages)} of {pages}")
+    gd = GridOptionsBuilder.from_dataframe(df_selection)
+    gd.configure_default_column(editable=True,groupable=True)
+    cellstyle_jscode = JsCode("""
+        function(params){
+            if (params.value == '2021') {
+                return {
+                    'color': '#E6E6E6',
+                    'backgroundColor' : '#287E8F'
+            }
+            }
+            if (params.value == '2022') {
+                return{
+                    'color'  : '#E6E6E6',
+                    'backgroundColor' : '#15CAB6'
+                }
+            }
+            else{
+                return{
+                    'color': '#E6E6E6',
+                    'backgroundColor': '#EF8A5A'
+                }
+            }
 
-    def get_price(self, token, currency = 'usd'):
-        api_url = f"https://api.coingecko.com/api/v3/coins/markets?vs_currency={currency}&ids={token.lower()}"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            get_result = response.json()
-            if len(get_result) != 0:
-                current_price = get_result[0]['current_price'] # in usd
-            else:
-                current_price = 0
-        else: current_price = 0
-        return current_price
+    };
+    """)
 
-# ---- STREAMLIT RENDER ---- #
-def streamlit_render():
+    gridOptions = gd.build()
+    grid_table = AgGrid(
+            df_selection,
+            editable=False,
+            height=350,
+            data_return_mode="filtered_and_sorted",
+            gridOptions=gridOptions,
+            update_mode= GridUpdateMode.SELECTION_CHANGED,
+            fit_columns_on_grid_load=True,
+            theme = "streamlit",
+            allow_unsafe_jscode=True
+            )
+
+@fragment
+def income_timeline(timeline, max_series, precision):
+    ## Granularity, split and date range only rerun this chart, every range total is two lookups
+    col1, col2 = st.columns(2)
+    freq = col1.radio("Granularity:", ['Month', 'Week'], horizontal=True)
+    by = col2.radio("Split by:", ['Blockchain', 'Tokens'], horizontal=True)
+    first, last = pd.Timestamp(timeline.first).date(), pd.Timestamp(timeline.last).date()
+    start, end = first, last
+    if first < last:
+        start, end = st.slider("Date range:", min_value=first, max_value=last, value=(first, last), format="YYYY-MM-DD")
+    options, size = charts.timeline_payload(timeline, start, end, freq, 'chains' if by == 'Blockchain' else 'tokens', max_series, precision)
+    timing.count("bytes.timeline", size)
+    st.metric(f"Income {start} to {end}", money(timeline.total(start, end), timeline.currency), None)
+    with timing.span('chart.timeline'):
+        st_echarts(options=options, height="500px", key="timeline")
+
+@fragment
+def price_whatif(inputs, cur):
+    ## Scenario kind and size only rerun this part, every outcome is one matrix product
+    modes = ['Random ±%', 'All tokens ±%']
+    if len(inputs['historical']) != 0:
+        modes.append('Historical')
+    if inputs['grid'] is not None:
+        modes.append('Grid')
+    col1, col2, col3 = st.columns(3)
+    mode = col1.radio("Price scenarios:", modes, horizontal=True)
+    pct = col2.slider("± percent:", min_value=1, max_value=90, value=scenario.PCT) if '±' in mode else None
+    n = col3.number_input("Scenarios:", min_value=100, max_value=20000, value=scenario.SCENARIOS, step=100) if mode == 'Random ±%' else None
+    base, amounts = inputs['base'], inputs['amounts']
+    with timing.span('scenarios'):
+        if mode == 'Random ±%':
+            prices = scenario.shocks(base, pct, int(n))
+        elif mode == 'All tokens ±%':
+            prices = scenario.sweep(base, pct)
+        else:
+            prices = inputs['historical'] if mode == 'Historical' else inputs['grid']
+        whatif = scenario.price_scenarios(amounts, prices)
+        totals = whatif.totals()
+        current = float(scenario.price_scenarios(amounts, base).totals()[0])
+        spread = whatif.percentiles(totals)
+        by_chain = whatif.percentiles(whatif.by_chain())
+    timing.count('scenarios', len(totals))
+    cols = st.columns(1 + len(spread))
+    cols[0].metric("At today's prices", money(current, cur), None)
+    for col, (name, value) in zip(cols[1:], spread.items()):
+        col.metric(f"{name} of {len(totals)} scenarios", money(value, cur), None)
+    col1, col2 = st.columns(2)
+    with col1, timing.span('chart.scenarios'):
+        st_echarts(options=charts.rounded(charts.histogram_options(totals, current, cur), currency.decimals(cur)), height="400px", key="scenarios")
+    with col2:
+        st.table(by_chain.round(currency.decimals(cur)))
+
+def money(value, cur):
+    if cur == 'USD':
+        return "$"+"{:.2f}".format(value)+" USD"
+    return f"{value:.{currency.decimals(cur)}f} {cur}"
+
+def price_badge(refresh):
+    # when the prices of the drawn snapshot are from, and whether newer data is on its way
+    priced_at = (snapshot.manifest() or {}).get('priced_at')
+    badge = "Prices as of " + (time.strftime('%Y-%m-%d %H:%M', time.localtime(priced_at)) if priced_at else "unknown")
+    if refresh.running():
+        badge += " · refreshing in the background"
+    st.caption(badge)
+    if refresh.error is not None:
+        st.warning(f"Last refresh failed, showing the previous data: {refresh.error}")
+
+def performance_panel():
+    # spans and counters of this rerun so far and of the last ingest of this process
+    with st.sidebar.expander("Performance", expanded=False):
+        for name in ('render', 'ingest'):
+            rec = timing.current() if name == 'render' else timing.last.get(name)
+            if rec is None:
+                continue
+            record = rec.record()
+            total = record['ms'] if record['ms'] is not None else (time.time() - record['time']) * 1000
+            st.markdown(f"**{name}** {total:,.1f} ms, {time.strftime('%H:%M:%S', time.localtime(record['time']))}")
+            spans = pd.DataFrame.from_dict(record['spans'], orient='index')
+            if len(spans) != 0:
+                st.table(spans)
+            if len(record['counts']) != 0:
+                st.table(pd.Series(record['counts'], name='count'))
+
+def streamlit_render(refresh=None, setting=None):
     # ---- CONFIGURATION ----
     ## --- all container ---
     header = st.container()
     metric_card = st.container()
     horizon_bar = st.container()
     year_chart = st.container()
+    time_chart = st.container()
+    what_if = st.container()
     sub_header = st.container()
     data_table = st.container()
     ## --- all container ---
@@ -98,25 +203,90 @@ def streamlit_render():
     with open("cfg/style.css") as f:
         st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-    ## Read csv from a
-    @st.experimental_memo
-    def get_data(dataset=r"data/payout.csv"):
-        return pd.read_csv(dataset)
-    df = get_data()
+    ## The snapshot and everything built from it are shared by all sessions, once per version and currency
+    manager = snapshot_manager.shared()
+    def get_data(version, cur):
+        with timing.span('snapshot.read'):
+            if cur.lower() == currency.BASE:
+                return manager.frame(version)
+            # USD frame times the token factors of `cur`, no price request and no parse
+            factor = published['fx'][cur.lower()]
+            return manager.get(version, ('frame', cur), lambda: currency.rescale(manager.frame(version), factor))
+    ## Aggregations for every chart
+    def get_cube(version, cur):
+        with timing.span('cube'):
+            return manager.get(version, ('cube', cur), lambda: payout_cube(get_data(version, cur), currency=cur))
+    ## Chart options ignore the table filters
+    def get_chart_options(version, cur, max_series, budget):
+        build = lambda: charts.build_all(get_cube(version, cur), max_series, budget, currency.decimals(cur))
+        with timing.span('charts'):
+            return manager.get(version, ('charts', cur, max_series, budget), build)
+    ## Running totals per day of the ledger, for the income over time chart
+    def get_timeline(version, cur):
+        def build():
+            # the ledger published with this version, data/ledger.arrow may be newer already
+            ledger = snapshot.read_if_exists(published['ledger']) if published.get('ledger') else None
+            return None if ledger is None else payout_timeline(ledger, get_data(version, cur), currency=cur)
+        with timing.span('timeline'):
+            return manager.get(version, ('timeline', cur), build)
+    ## Token amounts, today's prices and the stored scenario matrices of the price what-if
+    def get_scenario_inputs(version, cur):
+        def build():
+            df = get_data(version, cur)
+            amounts = scenario.amounts(df)
+            factor = (published.get('fx') or {}).get(cur.lower()) or {}
+            prices = {t: p * factor.get(t, 1.0) for t, p in (published.get('prices') or {}).items()}
+            base = scenario.base_prices(amounts.tokens, prices, df)
+            price_cfg = (setting or {}).get('price') or {}
+            ids = {t: str(cid).lower() for t, cid in ((setting or {}).get('API') or {}).items()}
+            series = {t: stored(ids[t], path=price_cfg.get('history-dir', HISTORY_DIR)) * factor.get(t, 1.0) for t in amounts.tokens if t in ids}
+            grid_file = ((setting or {}).get('scenarios') or {}).get('grid')
+            grid = None
+            if grid_file and os.path.isfile(grid_file):
+                table = pd.read_csv(grid_file, index_col=0) # scenario name, then one USD price column per token
+                grid = scenario.grid(table.mul(pd.Series({t: factor.get(t, 1.0) for t in table.columns})), amounts.tokens, base)
+            return {'amounts': amounts, 'base': base, 'historical': scenario.historical(series, amounts.tokens, base), 'grid': grid}
+        with timing.span('scenario.inputs'):
+            return manager.get(version, ('scenarios', cur), build)
+    ## Filter/sort index of the income table
+    def get_table_index(version, cur):
+        build = lambda: table_index(get_data(version, cur), filters=('Year', 'Blockchain', 'Contributor'))
+        with timing.span('table.index'):
+            return manager.get(version, ('table', cur), build)
+    published = snapshot.manifest()
+    if published is None:
+        # the dashboard's own ingest failed, its error tells why there is nothing to draw
+        if ((setting or {}).get('dashboard') or {}).get('ingest', True) and manager.refresher.error is not None:
+            st.error(f"Ingest failed, nothing published yet: {manager.refresher.error!r}")
+            st.stop()
+        st.info("No payout snapshot published yet, start the ingest worker: `python -m payout ingest --watch`")
+        st.stop()
+    version = published['version']
+    ## Display currency, every one of price.currencies in setting.yaml
+    currencies = [c.upper() for c in published.get('fx') or [currency.BASE]]
+    cur = currencies[0]
+    if len(currencies) > 1:
+        cur = st.sidebar.selectbox("Currency:", currencies, key='currency')
+    cube = get_cube(version, cur)
+    chart_cfg = (setting or {}).get('charts') or {}
+    options, sizes = get_chart_options(version, cur, chart_cfg.get('max-series', charts.MAX_SERIES), chart_cfg.get('budget', charts.BUDGET))
+    for name, size in sizes.items():
+        timing.count(f"bytes.{name}", size)
     # ---- CONFIGURATION ----
 
     # ---- Header TEXT ----
     with header:
         st.markdown('<h1 style="text-align:center"><img src="https://i.imgur.com/pyasxls.png" alt="logo" height="60">&nbsp Flipside Income Dashboard </h1>', unsafe_allow_html=True)
+        price_badge(refresh or manager.refresher)
     # ---- Header TEXT ----
 
     # ---- Metric Card ---- Yearly Total Earn
-    with metric_card:
-        yearly_sum = df.groupby("Year")["Amount_USD"].sum().sort_values()
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Income", "$"+"{:.2f}".format(yearly_sum.sum())+" USD", None) 
-        col2.metric("2021", "$"+"{:.2f}".format(yearly_sum.loc[2021])+" USD", None) 
-        col3.metric("2022", "$"+"{:.2f}".format(yearly_sum.loc[2022])+" USD", None)
+    with metric_card, timing.span('metrics'):
+        yearly_sum = cube.by_year()
+        cols = st.columns(1 + len(yearly_sum))
+        cols[0].metric("Total Income", money(cube.total(), cur), None)
+        for col, (year, value) in zip(cols[1:], yearly_sum.items()):
+            col.metric(str(year), money(value, cur), None)
         # spacing 
         st.markdown(r'''
             #
@@ -125,430 +295,37 @@ def streamlit_render():
 
     # ---- HORIZONTAL BAR ----
     with horizon_bar:
-        gb_blockchain = (df.groupby("Blockchain", as_index = False).sum()).sort_values('Amount_USD')
         col1, col2=st.columns(2)
         # Pie Chart  
-        with col1:
-            name = list(gb_blockchain['Blockchain'])
-            value = list(gb_blockchain['Amount_USD'])
-            wrap_bar = list()
-            for i in range(0,len(name)):
-                wrap_bar.append({"value": value[i], "name": name[i]})
-            pie_options = {
-                "title": {
-                    "text": "Total Income USD Slices",
-                    "left": "center",
-                    "top": 5,
-                    "textStyle": {"color": "#e6e6e6"},
-                },
-                "legend": {
-				    "bottom": 5,
-				    "left": 'center',
-                    "textStyle":{
-                        "color":'#E6E6E6'
-                        }
-			  	},
-                "tooltip": {"trigger": "item", "formatter": "{a} <br/>{b} : {c} ({d}%)"},
-                "series": [
-				    {
-				      "name": "Access From",
-				      "type": "pie",
-				      "radius": ["45%", "70%"],
-				      "avoidLabelOverlap": False,
-				      "label": {
-				        "show": False,
-				        "position": "center"
-				      },
-				      "emphasis": {
-				        "label": {
-				          "show": True,
-				          "fontSize": "20",
-				          "fontWeight": "bold"
-				        }
-				      },
-				      "labelLine": {
-				        "show": False
-				      },
-				      "data": wrap_bar,
-                      "color": ["#0f488c", "#696cb5", "#e85e76", "#ef8a5a", "#f6b53d", "#15cab6", "#287e8f"]
-				    }
-				]
-            }
-            st_echarts(options=pie_options, height="500px")
-
+        with col1, timing.span('chart.pie'):
+            st_echarts(options=options['pie'], height="500px", key="pie")
         # Horizontal Bar Chart by Chain
-        with col2:
-            wrap_chain = (df.groupby(["Blockchain", "Tokens"], as_index = False).sum())
-            # Prepare index for table
-            index_lst = wrap_chain[['Tokens', 'Blockchain']].agg('-'.join, axis=1)
-            wrap_chain.index = index_lst
-            token_lst = list(wrap_chain["Tokens"].unique())
-            # Prepare dataframe dict
-            chain_lst = list(wrap_chain["Blockchain"].unique())
-            dataframe = dict()
-            for i in token_lst:
-                dataframe[i] = dict()
-                for j in chain_lst:
-                    try:
-                        if wrap_chain.loc[str(i)+'-'+str(j), 'Tokens'] == i:
-                            dataframe[i][j] = wrap_chain.loc[str(i)+'-'+str(j), 'Amount_USD']
-                    except:
-                        dataframe[i][j] = 0
-            
-            eth_lst   = list(dataframe['ETH'].values())
-            usdc_lst  = list(dataframe['USDC'].values())
-            near_lst  = list(dataframe['NEAR'].values())
-            osmo_lst  = list(dataframe['OSMO'].values())
-            matic_lst = list(dataframe['MATIC'].values())
-            sol_lst   = list(dataframe['SOL'].values())
-            rune_lst  = list(dataframe['RUNE'].values())
-
-            bar_options = {
-                "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
-                "title": {
-                    "text": "Total Income USD by Blockchain",
-                    "textStyle":{
-                    "color":'#E6E6E6'
-                    },
-                    "left": "center",
-                },
-                "legend": {
-                    "data": list(dataframe.keys()),
-                    "textStyle":{
-                        "color":'#E6E6E6'
-                    },
-                    "bottom": 5,
-				    "left": 'center',
-                },
-                "grid": {"left": "3%", "right": "4%", "bottom": "10%", "containLabel": True},
-                "xAxis": {
-                    "type": "value",
-                    "axisLabel": {
-                            "textStyle": {
-                                "color": '#E6E6E6'
-                            }
-                        }
-                },
-                "yAxis": {
-                    "type": "category",
-                    "data": list(dataframe['ETH'].keys()),
-                    "axisLabel": {
-                            "textStyle": {
-                                "color": '#E6E6E6'
-                            }
-                        }
-                },
-                "series": [
-                    {
-                        "name": "ETH",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": eth_lst,
-                        "color": '#287e8f',
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "USDC",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": usdc_lst,
-                        "color": '#15cab6',
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "NEAR",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                            
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "OSMO",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": osmo_lst,
-                        "color": '#ef8a5a',
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "MATIC",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": matic_lst,
-                        "color": '#e85e76',
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "SOL",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": sol_lst,
-                        "color": '#696cb5',
-                        "emphasis": {"focus": 'series'}
-                    },
-                    {
-                        "name": "RUNE",
-                        "type": "bar",
-                        "stack": "total",
-                        "label": {"show": True},
-                        "emphasis": {"focus": "series"},
-                        "data": rune_lst,
-                        "color": '#0f488c',
-                        "emphasis": {"focus": 'series'}
-                    },
-                ],
-            }
-            st_echarts(options=bar_options, height="500px")
-    
+        with col2, timing.span('chart.chain_bar'):
+            st_echarts(options=options['chain_bar'], height="500px", key="chain_bar")
     
     with year_chart:
         col1, col2=st.columns(2)
         # Bar Chart By Years
-        with col1:
-            wrap_chain = (df.groupby(["Year", "Blockchain"], as_index = False).sum())
-            # Prepare index for table
-            index_lst = list(wrap_chain['Blockchain']+"-"+wrap_chain['Year'].astype(str))
-            wrap_chain.index = index_lst
-            chain_lst = list(wrap_chain["Blockchain"].unique())
-            # Prepare dataframe dict
-            year_lst = list(wrap_chain["Year"].unique())
-            dataframe = dict()
-            for i in chain_lst:
-                dataframe[i] = dict()
-                for j in year_lst:
-                    try:
-                        if wrap_chain.loc[str(i)+'-'+str(j), 'Blockchain'] == i:
-                            dataframe[i][j] = wrap_chain.loc[str(i)+'-'+str(j), 'Amount_USD']
-                    except:
-                        dataframe[i][j] = 0
-            
-            eth_lst   = list(dataframe['ETHEREUM'].values())
-            near_lst  = list(dataframe['NEAR-CHAIN'].values())
-            osmo_lst  = list(dataframe['OSMOSIS'].values())
-            matic_lst = list(dataframe['POLYGON'].values())
-            sol_lst   = list(dataframe['SOLANA'].values())
-            rune_lst  = list(dataframe['THORCHAIN'].values())
-
-            year_lst = list(str(k) for k in dataframe["ETHEREUM"].keys())
-
-            option = {
-                "tooltip": {
-                    "trigger": "axis",
-                    "axisPointer": {
-                    "type": "shadow"
-                    }
-                },
-                "title": {
-                    "text": "Total Income USD by Years",
-                    "textStyle":{
-                    "color":'#E6E6E6'
-                    },
-                    "left": "center",
-                },
-                "legend": {
-                    "textStyle":{
-                        "color":'#E6E6E6'
-                    },
-                    "bottom": 5,
-                    "left": 'center',
-                    "data": list(dataframe.keys())
-                },
-                "toolbox": {
-                    "show": True,
-                    "orient": "vertical",
-                    "left": "right",
-                    "top": "center",
-                    "feature": {
-                    "mark": { "show": True },
-                    "dataView": { "show": True, "readOnly": False },
-                    "magicType": { "show": True, "type": ["line", "bar", "stack"] },
-                    "restore": { "show": True },
-                    "saveAsImage": { "show": True }
-                    }
-                },
-                "xAxis": [
-                    {
-                    "type": "category",
-                    "axisTick": { "show": False },
-                    "data": year_lst,
-                    "axisLabel": {
-                                "textStyle": {
-                                    "color": '#E6E6E6'
-                                }
-                            }
-                    }
-                ],
-                "yAxis": [
-                    {
-                    "axisLabel": {
-                                "textStyle": {
-                                    "color": '#E6E6E6'
-                                }
-                            },
-                    "type": "value"
-                    }
-                ],
-                "series": [
-                    {
-                    "name": "ETHEREUM",
-                    "type": "bar",
-                    "barGap": 0,
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#287e8f',
-                    "data": eth_lst
-                    },
-                    {
-                    "name": "NEAR",
-                    "type": "bar",
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#15cab6',
-                    "data": near_lst
-                    },
-                    {
-                    "name": "OSMOSIS",
-                    "type": "bar",
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#f6b53d',
-                    "data": osmo_lst
-                    },
-                    {
-                    "name": "POLYGON",
-                    "type": "bar",
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#ef8a5a',
-                    "data": matic_lst
-                    },
-                    {
-                    "name": "SOLANA",
-                    "type": "bar",
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#e85e76',
-                    "data": sol_lst
-                    },
-                    {
-                    "name": "THORCHAIN",
-                    "type": "bar",
-                    "label": "labelOption",
-                    "emphasis": {
-                        "focus": "series"
-                    },
-                    "color": '#696cb5', 
-                    "data": rune_lst
-                    }
-                ]
-                }
-            st_echarts(options=option, height="500px")
-        
+        with col1, timing.span('chart.year_bar'):
+            st_echarts(options=options['year_bar'], height="500px", key="year_bar")
         # Sankey Diagram
-        with col2:
-            nodes = []
-            nodes.append({'name': 'Total'})
-            for y in year_lst:
-                nodes.append({'name': y})
-            for c in chain_lst:
-                nodes.append({'name': c})
-            for t in list(df["Tokens"].unique()):
-                nodes.append({'name': t})
-            
-            links = []
-            for y in year_lst:
-                year = int(y)
-                # total -> year
-                total_year = df.groupby(["Year"], as_index = False).sum()
-                total_year.index = list(total_year['Year'].astype(str))
-                links.append({'source': 'Total', 'target': str(y), 'value': total_year.loc[str(y), 'Amount_USD']})
-                # year -> chain
-                by_year = (df.query("Year==@year").groupby(["Blockchain", "Year"], as_index = False).sum())
-                by_year.index = list(by_year['Year'].astype(str)+"-"+by_year['Blockchain'])
-                for c in chain_lst:
-                    source = y
-                    target = c 
-                    value = by_year.loc[str(y)+'-'+str(c), 'Amount_USD']
-                    links.append({'source': source, 'target': target, 'value': value})
-                    # chain -> tokens
-                    by_token = (df.query("Year==@year & Blockchain==@c"))
-                    by_token.index = list(by_token['Blockchain']+"-"+by_token['Tokens'])
-                    token_lst = list(by_token["Tokens"].unique())
-                    for t in token_lst:
-                        s_ource = c 
-                        t_arget = t 
-                        v_alue = by_token.loc[str(c)+'-'+str(t), 'Amount_USD']
-                        links.append({'source': s_ource, 'target': t_arget, 'value': v_alue})
-            
-            js = {'nodes': nodes, 'links': links}
-            json_data = json.loads(json.dumps(js, indent=2))
-            
-            option = {
-                "title": {
-                            "text": "Total Income Sankey",
-                            "textStyle":{
-                            "color":'#E6E6E6'
-                            },
-                            "left": "center",
-                        },
-                "tooltip": {"trigger": "item", "triggerOn": "mousemove"},
-                "series": [
-                    {
-                        "type": "sankey",
-                        "data": json_data["nodes"],
-                        "links": json_data["links"],
-                        "emphasis": {"focus": "adjacency"},
-                        "levels": [
-                            {
-                                "depth": 0,
-                                "itemStyle": {"color": "#287e8f"},
-                                "lineStyle": {"color": "source", "opacity": 0.6},
-                            },
-                            {
-                                "depth": 1,
-                                "itemStyle": {"color": "#15cab6"},
-                                "lineStyle": {"color": "source", "opacity": 0.6},
-                            },
-                            {
-                                "depth": 2,
-                                "itemStyle": {"color": "#f6b53d"},
-                                "lineStyle": {"color": "source", "opacity": 0.6},
-                            },
-                            {
-                                "depth": 3,
-                                "itemStyle": {"color": "#ef8a5a"},
-                                "lineStyle": {"color": "source", "opacity": 0.6},
-                            },
-                        ],
-                        "lineStyle": {"curveness": 0.5},
-                    }
-                ],
-            }
-            st_echarts(option, height="500px")
+        with col2, timing.span('chart.sankey'):
+            st_echarts(options=options['sankey'], height="500px", key="sankey")
     # ---- HORIZONTAL BAR ----
 
+    # ---- TIME SERIES ----
+    with time_chart:
+        timeline = get_timeline(version, cur)
+        if timeline is not None:
+            income_timeline(timeline, chart_cfg.get('max-series', charts.MAX_SERIES), currency.decimals(cur))
+    # ---- TIME SERIES ----
+
+    # ---- PRICE WHAT-IF ----
+    with what_if:
+        st.markdown('<h2 style="text-align:center">Price What-If</h2>', unsafe_allow_html=True)
+        price_whatif(get_scenario_inputs(version, cur), cur)
+    # ---- PRICE WHAT-IF ----
+
     # ---- Sub-header ----
     with sub_header:
         # spacing 
@@ -560,74 +337,60 @@ def streamlit_render():
 
     # ---- DATA TABLE ----
     with data_table:
-        ## Filter Year
-        year = st.multiselect(
-            "Select the Year:",
-            list(df['Year'].unique()),
-            list(df['Year'].unique())
-        )
-        ## Filter Blockchain
-        blockchain = st.multiselect(
-            "Select the Blockchain:",
-            list(df['Blockchain'].unique()),
-            list(df['Blockchain'].unique())
-        )
-        ## Query the dataset based on the filter
-        df_selection = df.query(
-            "Year == @year & Blockchain == @blockchain"
-        )
-        # st.dataframe(df_selection)
-        # st.sidebar.number_input("Page size", value=5, min_value=0, max_value=10)
-        gd = GridOptionsBuilder.from_dataframe(df_selection)
-        gd.configure_pagination(enabled=True)
-        gd.configure_default_column(editable=True,groupable=True)
-        cellstyle_jscode = JsCode("""
-            function(params){
-                if (params.value == '2021') {
-                    return {
-                        'color': '#E6E6E6',
-                        'backgroundColor' : '#287E8F'
-                }
-                }
-                if (params.value == '2022') {
-                    return{
-                        'color'  : '#E6E6E6',
-                        'backgroundColor' : '#15CAB6'
-                    }
-                }
-                else{
-                    return{
-                        'color': '#E6E6E6',
-                        'backgroundColor': '#EF8A5A'
-                    }
-                }
-        
-        };
-        """)
-
-        gridOptions = gd.build()
-        grid_table = AgGrid(
-                df_selection,
-                editable=False,
-                height=350,
-                data_return_mode="filtered_and_sorted",
-                gridOptions=gridOptions,
-                update_mode= GridUpdateMode.SELECTION_CHANGED,
-                fit_columns_on_grid_load=True,
-                theme = "streamlit",
-                allow_unsafe_jscode=True
-                )
+        index = get_table_index(version, cur)
+        with timing.span('table'):
+            income_table(index, cur)
     # ---- DATA TABLE ----
+
+    if ((setting or {}).get('performance') or {}).get('panel'):
+        performance_panel()
+
+    # the page is drawn, rerun with the new snapshot once the background refresh has written it.
+    # Waited for in slices that call into streamlit, which can only stop the script at an st call
+    if refresh is None:
+        return
+    status = st.empty()
+    deadline = time.monotonic() + REFRESH_WAIT
+    with timing.span('refresh.wait'):
+        while not refresh.wait(REFRESH_SLICE) and time.monotonic() < deadline:
+            status.empty()
+    if not refresh.running() and snapshot.version() != version:
+        (getattr(st, 'rerun', None) or st.experimental_rerun)()
     # ---- STREAMLIT RENDER ----
 
 def main():
     # ---- MAIN FUNCTION ----
     setting_path = r"cfg/setting.yaml"
-    readme_path = r"README.md"
     cfg = os.path.abspath(setting_path)
-    readme = os.path.abspath(readme_path)
-    payout_calculator(cfg, readme)
-    streamlit_render()
+    with open(cfg, 'rb') as stream:
+        setting = yaml.safe_load(stream)
+    dashboard = setting.get('dashboard') or {}
+    perf = setting.get('performance') or {}
+    api_cfg = setting.get('api') or {}
+    manager = snapshot_manager.shared()
+    if api_cfg.get('port'):
+        # JSON of the same snapshot for other dashboards, once per process
+        try:
+            api.serve_once(api_cfg.get('host') or api.HOST, api_cfg['port'])
+        except OSError as exc:
+            st.sidebar.warning(f"JSON API not started on port {api_cfg['port']}: {exc}")
+    ingest = lambda: payout_calculator(cfg) # trackers from tracker.path in setting.yaml
+    # only when something it reads can have changed, not on every widget click
+    stamp = ingest_stamp(cfg, setting)
+    with timing.recording('render', log_file=perf.get('log') or None):
+        if not dashboard.get('ingest', True):
+            # read only, `python -m payout ingest --watch` publishes the snapshots
+            streamlit_render(setting=setting)
+            return
+        if not dashboard.get('progressive', True) or snapshot.version() is None:
+            # sessions arriving together wait for the same ingest
+            with timing.span('ingest'):
+                manager.refresh(ingest, wait=True, stamp=stamp)
+            streamlit_render(setting=setting)
+            return
+        # draw the last snapshot at once, parse and price in the background. Already off the
+        # page, the ingest fetches stale prices itself so the next snapshot has them
+        streamlit_render(manager.refresh(lambda: payout_calculator(cfg, background=False), stamp=stamp), setting)
     # ---- MAIN FUNCTION ----
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+"""
+    Benchmarks, run from the repo root, e.g. `python -m bench.bench_parser`
+"""
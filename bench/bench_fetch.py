@@ -0,0 +1,54 @@
+"""
+    Price fetch scheduler against the local fake CoinGecko, no network needed
+
+        python -m bench.bench_fetch --sessions 8 --tokens 40 --rate-429 0.3
+
+    Runs `--sessions` concurrent price fetches (like dashboard sessions starting together)
+    against a provider answering a share of requests with 429, then once more with a slow
+    primary and a fast fallback provider, and prints how long they took and how many
+    tokens ended up without a price
+"""
+import argparse, threading, time
+import requests
+from payout.fetch import fetch_scheduler
+from payout.price import price_service
+from bench.fake_coingecko import fake_coingecko
+
+def run_sessions(urls, api, n_sessions, **limits):
+    # wall time, tokens priced 0 per session, one Session per dashboard session
+    zeros = [None] * n_sessions
+
+    def session(n):
+        scheduler = fetch_scheduler(urls, requests.Session(), **limits)
+        prices = price_service(api, url=urls[0], scheduler=scheduler).fetch()
+        zeros[n] = sum(1 for p in prices.values() if p == 0)
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(n_sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, zeros
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sessions', type=int, default=8)
+    ap.add_argument('--tokens', type=int, default=40)
+    ap.add_argument('--rate-429', type=float, default=0.3)
+    ap.add_argument('--slow', type=float, default=3.0, help="seconds the slow primary takes")
+    args = ap.parse_args()
+    api = {f"TK{n}": f"token-{n}" for n in range(args.tokens)}
+    limits = dict(rate=20, burst=5, timeout=10, retries=6, backoff=0.05, max_backoff=1, hedge=0.5)
+
+    with fake_coingecko(rate_429=args.rate_429, seed=1) as fake:
+        elapsed, zeros = run_sessions([fake.url], api, args.sessions, **limits)
+        print(f"429 share {args.rate_429:.0%}: {args.sessions} sessions in {elapsed:.2f}s, "
+              f"{fake.served} requests, tokens at 0 per session: {zeros}")
+
+    with fake_coingecko(delay=args.slow) as slow, fake_coingecko(delay=0.05) as fallback:
+        elapsed, zeros = run_sessions([slow.url, fallback.url], api, args.sessions, **limits)
+        print(f"primary {args.slow:.1f}s slow, fallback after {limits['hedge']}s: {args.sessions} sessions in {elapsed:.2f}s, "
+              f"tokens at 0 per session: {zeros}")
+
+if __name__ == "__main__":
+    main()
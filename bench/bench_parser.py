@@ -0,0 +1,70 @@
+"""
+    Parser benchmark on a synthetic tracker
+
+        python -m bench.bench_parser --lines 1000000 --chains 40 --years 5 [--legacy]
+
+    `--legacy` also times the previous per-line f-string regex parser (slow, use fewer lines)
+"""
+import argparse, os, re, tempfile, time
+from payout.tracker import tracker_parser
+from bench.synthetic import synthetic_config, write_tracker
+
+def legacy_parse(trk_f, chain_denoms, years):
+    # the parse_in_f loop this parser replaced, kept for comparison
+    blockchain_lst = list(chain_denoms.keys())
+    d = {y: {c: {t: 0 for t in ts} for c, ts in chain_denoms.items()} for y in years}
+    curr_chain = curr_year = None
+    with open(trk_f, 'r', encoding="utf8") as fp:
+        for line in fp:
+            for n in range(0, len(blockchain_lst)):
+                if re.match(f".+{blockchain_lst[n]} Bounties+.", line):
+                    curr_chain = blockchain_lst[n]
+            for n in range(0, len(years)):
+                if re.match(f"^## +{years[n]}", line):
+                    curr_year = years[n]
+            if re.match(r"^\|.(✅)", line):
+                for denom in chain_denoms[curr_chain]:
+                    payout = re.findall(rf"((\d+\.\d+)|\d+)(?=\s*{denom})", line)
+                    if len(payout) != 0:
+                        d[curr_year][curr_chain][denom] += float(payout[0][0])
+    return d
+
+def bench_parse(path, chains, years):
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf8') as fp:
+        rows = tracker_parser(chains, years).parse(fp)
+    return time.perf_counter() - start, rows
+
+def paid_totals(rows):
+    totals = dict()
+    for year, chain, status, _, _, _, _, token, amount in rows:
+        if status == 'paid':
+            totals[(year, chain, token)] = totals.get((year, chain, token), 0) + amount
+    return totals
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--lines', type=int, default=1000000)
+    ap.add_argument('--chains', type=int, default=40)
+    ap.add_argument('--years', type=int, default=5)
+    ap.add_argument('--legacy', action='store_true')
+    args = ap.parse_args()
+
+    chains, years = synthetic_config(args.chains, args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'README.md')
+        write_tracker(path, chains, years, max(1, args.lines // (len(years) * len(chains)) - 4))
+        with open(path, 'rb') as fp:
+            n_lines = sum(1 for _ in fp)
+        elapsed, rows = bench_parse(path, chains, years)
+        print(f"tracker_parser: {n_lines} lines, {len(chains)} chains, {len(years)} years, {len(rows)} rows: {elapsed:.3f}s ({n_lines / elapsed:,.0f} lines/s)")
+        if args.legacy:
+            start = time.perf_counter()
+            old = legacy_parse(path, chains, years)
+            legacy = time.perf_counter() - start
+            totals = paid_totals(rows)
+            same = all(abs(old[y][c][t] - totals.get((y, c, t), 0)) < 1e-6 for y in old for c in old[y] for t in old[y][c])
+            print(f"legacy parse_in_f: {legacy:.3f}s ({legacy / elapsed:.1f}x slower), same totals: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+    Benchmark suite: parse, price fetch, dataframe, chart options and the income timeline on
+    synthetic projects
+
+        python -m bench.bench_suite [--sizes small,medium,large] [--repeat 5] [--latency 0.05]
+                                    [--out data/bench/<commit>.json] [--compare data/bench/<old>.json]
+
+    Every size is a generated README.md + setting.yaml (chains x years x rows per section, see
+    bench.synthetic) priced by the local fake CoinGecko with `--latency` seconds per request.
+    Results (min and median ms per benchmark and size) are saved as JSON, `--compare` prints
+    the ratio to an earlier result file
+"""
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time
+from bench.fake_coingecko import fake_coingecko
+from bench.synthetic import write_project
+from bench.tracker_server import tracker_server
+from payout.calculator import payout_calculator
+from payout.ingest import ingest_state
+from payout.ledger import payout_ledger
+from payout.cube import payout_cube
+from payout.timeline import payout_timeline
+from payout import charts
+
+SIZES = {
+    'small': (5, 2, 20),
+    'medium': (20, 3, 100),
+    'large': (40, 5, 500),
+}
+
+def measure(fn, repeat, setup=None):
+    # ms of every run of fn(), setup() runs untimed before each
+    runs = list()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return runs
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def remove_data(root):
+    for dirpath, _, files in os.walk(os.path.join(root, 'data')):
+        for f in files:
+            remove(os.path.join(dirpath, f))
+
+def bench_size(name, repeat, url):
+    """
+        {benchmark: [ms, ...]} for one size, run inside a fresh project directory
+    """
+    n_chains, n_years, rows = SIZES[name]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        tracker, setting = write_project(root, n_chains, n_years, rows, url)
+        os.chdir(root) # data/ of the project
+        try:
+            results = dict()
+            results['ingest_cold'] = measure(lambda: payout_calculator(setting), repeat, setup=lambda: remove_data(root))
+            calc = payout_calculator(setting)
+
+            def fresh_state():
+                calc.state = ingest_state(os.path.join(root, 'none.json'))
+            results['parse_full'] = measure(lambda: calc.parse_in_f(tracker), repeat, setup=fresh_state)
+            calc.state = ingest_state()
+            results['parse_unchanged'] = measure(lambda: calc.parse_in_f(tracker), repeat)
+            with tracker_server(root) as server:
+                url = f"{server.url}/{os.path.relpath(tracker, root)}"
+                results['ingest_remote'] = measure(lambda: payout_calculator(setting, url), repeat, setup=lambda: remove_data(root))
+                results['ingest_remote_304'] = measure(lambda: payout_calculator(setting, url), repeat)
+            remove_data(root)
+            calc = payout_calculator(setting)
+
+            cache = os.path.join('data', 'price_cache.json')
+            results['fetch_cold'] = measure(calc.fetch_prices, repeat, setup=lambda: remove(cache))
+            results['fetch_warm'] = measure(calc.fetch_prices, repeat)
+
+            totals = payout_ledger(calc.ledger).totals()
+            results['dataframe'] = measure(lambda: calc.dataframe(totals), repeat)
+            df = calc.dataframe(totals)
+            results['chart_options'] = measure(lambda: charts.build_all(payout_cube(df)), repeat)
+            payload = charts.build_all(payout_cube(df))[1]
+            results['timeline'] = measure(lambda: payout_timeline(calc.ledger, df), repeat)
+            timeline = payout_timeline(calc.ledger, df)
+            results['timeline_range'] = measure(lambda: charts.timeline_payload(timeline, timeline.first, timeline.last, 'Week'), repeat)
+            with open(tracker, 'rb') as fp:
+                lines = sum(1 for _ in fp)
+            return results, {'chains': n_chains, 'years': n_years, 'rows': rows, 'lines': lines, 'ledger_rows': len(calc.ledger), 'payload_bytes': payload}
+        finally:
+            os.chdir(cwd)
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results, path):
+    with open(path, 'r', encoding='utf-8') as fp:
+        old = {(r['size'], r['bench']): r for r in json.load(fp)['results']}
+    print(f"\ncompared to {path} (median, >1 is slower now)")
+    for r in results:
+        before = old.get((r['size'], r['bench']))
+        if before:
+            print(f"  {r['size']:>7} {r['bench']:<18} {before['median_ms']:>10.2f} -> {r['median_ms']:>10.2f} ms  x{r['median_ms'] / max(before['median_ms'], 1e-9):.2f}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='small,medium,large', help=f"comma separated, of {', '.join(SIZES)}")
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--latency', type=float, default=0.05, help="fake CoinGecko seconds per request")
+    ap.add_argument('--out', default=None)
+    ap.add_argument('--compare', default=None)
+    args = ap.parse_args()
+
+    version = commit()
+    results = list()
+    sizes = dict()
+    with fake_coingecko(delay=args.latency) as fake:
+        for size in args.sizes.split(','):
+            runs, sizes[size] = bench_size(size, args.repeat, fake.url)
+            print(f"{size}: {sizes[size]}")
+            for bench, ms in runs.items():
+                results.append({'size': size, 'bench': bench, 'min_ms': min(ms), 'median_ms': statistics.median(ms), 'runs': ms})
+                print(f"  {bench:<18} min {min(ms):>10.2f} ms  median {statistics.median(ms):>10.2f} ms")
+
+    out = args.out or os.path.join('data', 'bench', f"{version}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as fp:
+        json.dump({
+            'commit': version,
+            'time': time.time(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'latency': args.latency,
+            'repeat': args.repeat,
+            'sizes': sizes,
+            'results': results,
+        }, fp, indent=2)
+    print(f"saved {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
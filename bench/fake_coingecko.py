@@ -0,0 +1,121 @@
+"""
+    Local stand-in for the CoinGecko endpoints the dashboard uses, with injectable latency and errors
+
+        python -m bench.fake_coingecko --port 8765 --delay 0.5 --rate-429 0.3
+
+    then point `price.url` (or one of `price.fallback-urls`) of setting.yaml to http://127.0.0.1:8765.
+    Prices are made up but stable: the same id always gets the same price
+"""
+import argparse, hashlib, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+def fake_price(cid, day=0):
+    # stable per id, drifting a little per day for the history endpoint
+    base = int(hashlib.sha256(cid.encode('utf-8')).hexdigest()[:8], 16) % 10000 / 100 + 0.01
+    return round(base * (1 + 0.01 * ((day * 7) % 11 - 5)), 6)
+
+# USD -> other currencies, for /simple/price
+FX = {'usd': 1.0, 'eur': 0.92, 'gbp': 0.79, 'jpy': 150.0, 'btc': 1 / 60000, 'eth': 1 / 3000}
+
+class fake_coingecko():
+    """
+        /coins/markets, /simple/price and /coins/{id}/market_chart/range on a local port, in a background thread.
+        Every request sleeps `delay` seconds (plus up to `jitter`), the first `fail_first`
+        requests and then a `rate_429` share of them answer 429 (with Retry-After when
+        `retry_after` is set), a `rate_500` share answers 500. `calls` counts the requests per path
+    """
+    def __init__(self, port=0, delay=0.0, jitter=0.0, rate_429=0.0, rate_500=0.0, fail_first=0, retry_after=None, seed=0):
+        self.delay = delay
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = dict()
+        self.served = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="fake-coingecko", daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def answer(self, path, query):
+        # (status, body) of one request
+        with self.lock:
+            key = '/coins/{id}/market_chart/range' if path.endswith('/market_chart/range') else path
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.served += 1
+            failing = self.served <= self.fail_first
+            draw = self.random.random()
+            delay = self.delay + self.random.uniform(0, self.jitter)
+        time.sleep(delay)
+        if failing or draw < self.rate_429:
+            return 429, {'status': {'error_code': 429, 'error_message': "You've exceeded the Rate Limit."}}
+        if draw < self.rate_429 + self.rate_500:
+            return 500, {'error': 'internal error'}
+        if path == '/coins/markets':
+            ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+            return 200, [{'id': cid, 'current_price': fake_price(cid)} for cid in ids]
+        if path == '/simple/price':
+            ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+            currencies = [c for c in query.get('vs_currencies', [''])[0].split(',') if c]
+            return 200, {cid: {c: round(fake_price(cid) * FX.get(c, 1.0), 10) for c in currencies} for cid in ids}
+        if path.startswith('/coins/') and path.endswith('/market_chart/range'):
+            cid = path.split('/')[2]
+            start, end = int(float(query['from'][0])), int(float(query['to'][0]))
+            days = range(start // 86400, end // 86400 + 1)
+            return 200, {'prices': [[day * 86400000, fake_price(cid, day)] for day in days if start <= day * 86400 <= end]}
+        return 404, {'error': 'not found'}
+
+    def handler(self):
+        fake = self
+
+        class handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, body = fake.answer(url.path.rstrip('/'), parse_qs(url.query))
+                raw = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                if status == 429 and fake.retry_after is not None:
+                    self.send_header('Retry-After', str(fake.retry_after))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+        return handler
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--delay', type=float, default=0.0, help="seconds per request")
+    ap.add_argument('--jitter', type=float, default=0.0, help="extra random seconds per request")
+    ap.add_argument('--rate-429', type=float, default=0.0, help="share of requests answered 429")
+    ap.add_argument('--rate-500', type=float, default=0.0, help="share of requests answered 500")
+    ap.add_argument('--fail-first', type=int, default=0, help="answer the first N requests 429")
+    ap.add_argument('--retry-after', type=int, default=None, help="Retry-After seconds sent with 429")
+    args = ap.parse_args()
+    fake = fake_coingecko(args.port, args.delay, args.jitter, args.rate_429, args.rate_500, args.fail_first, args.retry_after)
+    print(f"fake CoinGecko on {fake.url}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == "__main__":
+    main()
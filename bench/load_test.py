@@ -0,0 +1,248 @@
+"""
+    Load test: N concurrent headless dashboard sessions against the fake CoinGecko
+
+        python -m bench.load_test [--sessions 8] [--reruns 5] [--size small] [--latency 0.05]
+                                  [--mode progressive|blocking|read-only] [--edit] [--out result.json]
+
+    Every session is a streamlit AppTest of app.py (needs streamlit >= 1.33) running in its own
+    thread of this process, like the sessions of one `streamlit run`, on a generated project
+    (see bench.synthetic and bench.bench_suite sizes). `--mode` sets dashboard.ingest/progressive,
+    `--edit` appends a row to the tracker before every round of reruns. Reports the p50/p99
+    rerun latency, the time until the page was drawn (the rerun minus waiting for the background
+    refresh), CPU time, peak memory, ingests and HTTP calls per rerun
+"""
+import argparse, json, math, os, re, shutil, statistics, tempfile, threading, time
+from contextlib import contextmanager, nullcontext
+import psutil
+import yaml
+from bench.fake_coingecko import fake_coingecko
+from bench.synthetic import write_project
+from bench.bench_suite import SIZES
+from payout.calculator import payout_calculator
+from payout.timing import LOG_FILE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STREAMLIT = (1, 33) # st.experimental_fragment for the partial reruns of app.py, what shared_runtime patches is checked from there on
+MODES = {
+    'progressive': {'ingest': True, 'progressive': True},
+    'blocking': {'ingest': True, 'progressive': False},
+    'read-only': {'ingest': False},
+}
+
+def streamlit_version():
+    import streamlit
+    return tuple(int(n) for n in re.findall(r"\d+", streamlit.__version__)[:2])
+
+def percentile(values, q):
+    # nearest rank, q in 0..100
+    ranked = sorted(values)
+    return ranked[max(0, math.ceil(q / 100 * len(ranked)) - 1)] if ranked else None
+
+class memory_peak():
+    # highest RSS of this process, sampled every `every` seconds in a background thread
+    def __init__(self, every=0.02):
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self.every = every
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name="memory-peak", daemon=True)
+
+    def sample(self):
+        while not self.done.wait(self.every):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+@contextmanager
+def shared_runtime():
+    """
+        Make concurrent AppTest runs behave like the sessions of one streamlit server. AppTest
+        sets the Runtime singleton for the length of one run and clears it afterwards, which
+        breaks the runs of the other sessions still going: the last one that was set is kept.
+        And every run compiles app.py with a new ScriptCache, concurrent compiles trip over each
+        other: they share one, like a server does. Every run also wraps config.get_option with
+        its overrides and puts back what it found, overlapping runs put back each other's
+        wrapper until the chain of them overflows the stack: the overrides are set once for all
+        runs. Needs streamlit STREAMLIT or newer
+    """
+    if streamlit_version() < STREAMLIT:
+        raise RuntimeError(f"AppTest needs streamlit {'.'.join(map(str, STREAMLIT))} or newer")
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+    # where AppTest makes its ScriptCache moved between versions, it is replaced wherever it is
+    modules = [m for m in (app_test, local_script_runner) if hasattr(m, 'ScriptCache')]
+    saved = Runtime.__dict__['instance'], Runtime.__dict__['exists'], [m.ScriptCache for m in modules]
+    saved_config = config.get_option, getattr(app_test, 'patch_config_options', None)
+    overrides = dict()
+    last = dict()
+    cache = modules[0].ScriptCache()
+
+    def current(cls):
+        if cls._instance is not None:
+            last['runtime'] = cls._instance
+        return last.get('runtime')
+
+    def instance(cls):
+        found = current(cls)
+        if found is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return found
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: current(cls) is not None)
+    for m in modules:
+        m.ScriptCache = lambda: cache
+    if saved_config[1] is not None:
+        get_option = saved_config[0]
+        config.get_option = lambda name: overrides[name] if name in overrides else get_option(name)
+
+        def patch_config_options(found):
+            overrides.update(found)
+            return nullcontext()
+        app_test.patch_config_options = patch_config_options
+    try:
+        yield
+    finally:
+        Runtime.instance, Runtime.exists = saved[:2]
+        for m, original in zip(modules, saved[2]):
+            m.ScriptCache = original
+        if saved_config[1] is not None:
+            config.get_option, app_test.patch_config_options = saved_config
+
+def write_app(root, url, mode):
+    # app.py, style.css and the generated project in `root`, setting.yaml set up for `mode`
+    n_chains, n_years, rows = SIZES[mode['size']]
+    tracker, setting = write_project(root, n_chains, n_years, rows, url)
+    shutil.copy(os.path.join(ROOT, 'app.py'), os.path.join(root, 'app.py'))
+    shutil.copy(os.path.join(ROOT, 'cfg', 'style.css'), os.path.join(root, 'cfg', 'style.css'))
+    with open(setting, 'r', encoding='utf-8') as fp:
+        cfg = yaml.safe_load(fp)
+    cfg['dashboard'] = MODES[mode['mode']]
+    cfg['performance'] = {'panel': False, 'log': LOG_FILE}
+    with open(setting, 'w', encoding='utf-8') as fp:
+        yaml.safe_dump(cfg, fp, sort_keys=False)
+    return tracker, setting
+
+def append_row(tracker, n):
+    # one more paid bounty at the end of the last section
+    with open(tracker, 'r', encoding='utf-8') as fp:
+        last = [line for line in fp if line.startswith('|')][-1]
+    cells = last.split('|')
+    cells[1] = " ✅ "
+    cells[2] = f" [load {n}](https://app.flipsidecrypto.com/dashboard/load-{n}) "
+    with open(tracker, 'a', encoding='utf-8') as fp:
+        fp.write('|'.join(cells))
+
+def session(at, reruns, start, rounds, latencies, errors):
+    """
+        One headless session (an AppTest): the first run, then `reruns` reruns, each one after
+        the round barrier so all sessions rerun together
+    """
+    start.wait()
+    for n in range(reruns + 1):
+        if n > 0:
+            rounds.wait()
+        began = time.perf_counter()
+        try:
+            at.run()
+            if len(at.exception) != 0:
+                errors.append(at.exception[0].message)
+        except Exception as exc:
+            errors.append(repr(exc))
+        latencies.append((n, (time.perf_counter() - began) * 1000))
+
+def load_test(sessions, reruns, size, latency, mode, edit=False, timeout=300):
+    """
+        {metric: value} of `sessions` concurrent sessions rerunning `reruns` times
+    """
+    from streamlit.testing.v1 import AppTest
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root, fake_coingecko(delay=latency) as fake:
+        tracker, setting = write_app(root, fake.url, {'size': size, 'mode': mode})
+        os.chdir(root) # app.py reads cfg/ and data/ of the project
+        try:
+            if mode == 'read-only':
+                payout_calculator(setting) # what the ingest worker would have published
+            apps = [AppTest.from_file(os.path.join(root, 'app.py'), default_timeout=timeout) for _ in range(sessions)]
+            served = fake.served
+            latencies, errors = list(), list()
+            start = threading.Barrier(sessions)
+            # the edit happens once per round, before the sessions go
+            rounds = threading.Barrier(sessions, action=(lambda: append_row(tracker, time.time_ns())) if edit else None)
+            process = psutil.Process()
+            cpu = process.cpu_times()
+            began = time.perf_counter()
+            with memory_peak() as memory, shared_runtime():
+                threads = [threading.Thread(target=session, args=(at, reruns, start, rounds, latencies, errors)) for at in apps]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            wall = time.perf_counter() - began
+            used = process.cpu_times()
+            cpu_s = (used.user - cpu.user) + (used.system - cpu.system)
+
+            records = list()
+            if os.path.exists(LOG_FILE):
+                with open(LOG_FILE, 'r', encoding='utf-8') as fp:
+                    records = [json.loads(line) for line in fp]
+            renders = [r for r in records if r['run'] == 'render']
+            drawn = [r['ms'] - r['spans'].get('refresh.wait', {}).get('ms', 0) for r in renders if r['ms'] is not None]
+            runs = [ms for _, ms in latencies]
+            first = [ms for n, ms in latencies if n == 0]
+            again = [ms for n, ms in latencies if n > 0]
+            return {
+                'sessions': sessions,
+                'reruns': len(runs),
+                'errors': len(errors),
+                'first_error': errors[0] if errors else None,
+                'p50_ms': statistics.median(runs),
+                'p99_ms': percentile(runs, 99),
+                'first_p50_ms': statistics.median(first),
+                'rerun_p50_ms': statistics.median(again) if again else None,
+                'rerun_p99_ms': percentile(again, 99),
+                'drawn_p50_ms': statistics.median(drawn) if drawn else None,
+                'drawn_p99_ms': percentile(drawn, 99),
+                'ingests': sum(1 for r in records if r['run'] == 'ingest'),
+                'http_calls': fake.served - served,
+                'http_per_rerun': (fake.served - served) / len(runs),
+                'wall_s': wall,
+                'cpu_s': cpu_s,
+                'cpu_cores': cpu_s / wall,
+                'peak_rss_mb': memory.peak / 2**20,
+            }
+        finally:
+            os.chdir(cwd)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sessions', type=int, default=8)
+    ap.add_argument('--reruns', type=int, default=5, help="reruns per session after its first run")
+    ap.add_argument('--size', default='small', choices=list(SIZES))
+    ap.add_argument('--latency', type=float, default=0.05, help="fake CoinGecko seconds per request")
+    ap.add_argument('--mode', default='progressive', choices=list(MODES))
+    ap.add_argument('--edit', action='store_true', help="append a tracker row before every round of reruns")
+    ap.add_argument('--timeout', type=float, default=300, help="seconds per run before a session gives up")
+    ap.add_argument('--out', default=None, help="save the result as JSON")
+    args = ap.parse_args()
+    if streamlit_version() < STREAMLIT:
+        import streamlit
+        ap.error(f"needs streamlit {'.'.join(map(str, STREAMLIT))} or newer, {streamlit.__version__} is installed (see requirements.txt)")
+
+    result = load_test(args.sessions, args.reruns, args.size, args.latency, args.mode, args.edit, args.timeout)
+    result.update(size=args.size, mode=args.mode, edit=args.edit, latency=args.latency)
+    for key, value in result.items():
+        print(f"  {key:<14} {value:.2f}" if isinstance(value, float) else f"  {key:<14} {value}")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as fp:
+            json.dump(result, fp, indent=2)
+
+if __name__ == "__main__":
+    main()
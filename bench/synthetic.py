@@ -0,0 +1,76 @@
+"""
+    Synthetic trackers and setting.yaml files of any size
+
+        python -m bench.synthetic --chains 40 --years 5 --rows 200 --out /tmp/big
+
+    writes /tmp/big/README.md (N chains x M years sections of K rows) and /tmp/big/cfg/setting.yaml
+"""
+import argparse, os, random
+import yaml
+
+def synthetic_config(n_chains, n_years, start_year=2021):
+    # every chain pays its own token, every third chain also pays USDC
+    chains = dict()
+    for n in range(n_chains):
+        denoms = [f"TK{n}"]
+        if n % 3 == 0:
+            denoms.append("USDC")
+        chains[f"CHAIN{n}"] = denoms
+    return chains, [start_year + n for n in range(n_years)]
+
+def write_tracker(path, chains, years, rows, seed=0):
+    """
+        A tracker with `rows` bounty rows in every year/chain section, statuses and amounts at random
+    """
+    rnd = random.Random(seed)
+    marks = ["✅", "✅", "✅", "❌", "💀", "👑"]
+    with open(path, 'w', encoding='utf-8') as fp:
+        for year in years:
+            fp.write(f"## {year} [👑 0 Grand Prize Wins]\n\n")
+            for chain, denoms in chains.items():
+                fp.write(f"### ⚡ {chain} Bounties [{year}]\n")
+                fp.write("| Check | Bounties | Month | Date 📅 | Rewards 💰 |\n|---|---|---|---|---|\n")
+                for n in range(rows):
+                    day, month = rnd.randint(1, 28), rnd.randint(1, 12)
+                    fp.write(f"| {rnd.choice(marks)} | [{n}. Bounty {n}](https://app.flipsidecrypto.com/dashboard/b-{n}) | Jan | {day}/{month} | {rnd.uniform(1, 500):.2f} {rnd.choice(denoms)} |\n")
+
+def write_setting(path, chains, years, url, tracker="README.md", **price):
+    """
+        setting.yaml for `chains`/`years`, every token priced from `url` (the fake CoinGecko),
+        `price` overrides keys of the price section
+    """
+    tokens = sorted({d for ds in chains.values() for d in ds})
+    setting = {
+        'blockchain-list': chains,
+        'API': {token: f"{token.lower()}-coin" for token in tokens},
+        'year': years,
+        'price': {'url': url, 'rate': 1000, 'burst': 1000, 'timeout': 10, 'retries': 2, **price},
+        'tracker': {'path': tracker, 'workers': 0},
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fp:
+        yaml.safe_dump(setting, fp, sort_keys=False)
+
+def write_project(root, n_chains, n_years, rows, url, seed=0):
+    # README.md and cfg/setting.yaml under `root`, returns (tracker, setting) paths
+    chains, years = synthetic_config(n_chains, n_years)
+    tracker = os.path.join(root, 'README.md')
+    setting = os.path.join(root, 'cfg', 'setting.yaml')
+    write_tracker(tracker, chains, years, rows, seed)
+    write_setting(setting, chains, years, url, tracker=tracker)
+    return tracker, setting
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--chains', type=int, default=40)
+    ap.add_argument('--years', type=int, default=5)
+    ap.add_argument('--rows', type=int, default=200, help="bounty rows per year/chain section")
+    ap.add_argument('--url', default="http://127.0.0.1:8765", help="price url, see bench.fake_coingecko")
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', required=True)
+    args = ap.parse_args()
+    tracker, setting = write_project(args.out, args.chains, args.years, args.rows, args.url, args.seed)
+    print(f"wrote {tracker} and {setting}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+    Local HTTP server for the trackers of a folder, like the raw file view of a Git host
+
+        python -m bench.tracker_server --root . --port 8766
+
+    then set `tracker.path` of setting.yaml to http://127.0.0.1:8766/README.md. Files are sent
+    in chunks with an ETag (hash of the content) and a Last-Modified, If-None-Match and
+    If-Modified-Since are answered with 304 Not Modified
+"""
+import argparse, hashlib, os, threading, time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, unquote
+
+CHUNK = 16 * 1024
+
+class tracker_server():
+    """
+        Serves the files under `root` on a local port in a background thread. `validators`
+        false leaves out ETag/Last-Modified (every request is a 200). `calls` counts the
+        answers per status and `sent` the body bytes
+    """
+    def __init__(self, root='.', port=0, validators=True, delay=0.0):
+        self.root = os.path.abspath(root)
+        self.validators = validators
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.calls = dict()
+        self.sent = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="tracker-server", daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, status, sent=0):
+        with self.lock:
+            self.calls[status] = self.calls.get(status, 0) + 1
+            self.sent += sent
+
+    def handler(self):
+        fake = self
+
+        class handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(fake.delay)
+                path = os.path.normpath(os.path.join(fake.root, unquote(urlparse(self.path).path).lstrip('/')))
+                if not path.startswith(fake.root) or not os.path.isfile(path):
+                    fake.count(404)
+                    self.send_error(404)
+                    return
+                with open(path, 'rb') as fp:
+                    body = fp.read()
+                mtime = int(os.stat(path).st_mtime)
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if fake.validators:
+                    since = self.headers.get('If-Modified-Since')
+                    match = self.headers.get('If-None-Match')
+                    if match is not None:
+                        fresh = etag in [t.strip() for t in match.split(',')]
+                    else:
+                        try:
+                            fresh = since is not None and mtime <= parsedate_to_datetime(since).timestamp()
+                        except (TypeError, ValueError):
+                            fresh = False
+                    if fresh:
+                        fake.count(304)
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+                fake.count(200, len(body))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/markdown; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if fake.validators:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', formatdate(mtime, usegmt=True))
+                self.end_headers()
+                for n in range(0, len(body), CHUNK):
+                    self.wfile.write(body[n:n + CHUNK])
+
+            def log_message(self, *args):
+                pass
+        return handler
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--root', default='.')
+    ap.add_argument('--port', type=int, default=8766)
+    ap.add_argument('--delay', type=float, default=0.0, help="seconds per request")
+    ap.add_argument('--no-validators', action='store_true', help="no ETag/Last-Modified, always 200")
+    args = ap.parse_args()
+    server = tracker_server(args.root, args.port, not args.no_validators, args.delay)
+    print(f"trackers of {server.root} on {server.url}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+    Flipside income dashboard helpers: price fetching, tracker parsing and data snapshots
+"""
+from .price import price_service
+from .fetch import fetch_scheduler, token_bucket
+from .price_cache import price_cache
+from .tracker import tracker_parser
+from .ingest import incremental_parser, ingest_state
+from . import snapshot
+from .cube import payout_cube
+from . import charts
+from .table import table_index
+from .ledger import payout_ledger
+from .timeline import payout_timeline
+from .history import price_history
+from .scenario import price_scenarios
+from .refresh import background_refresh
+from .calculator import payout_calculator
+from .manager import snapshot_manager
+from .api import payout_api
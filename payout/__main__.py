@@ -0,0 +1,89 @@
+"""
+    Headless ingest worker and JSON API, run from the repo root
+
+        python -m payout ingest [--config cfg/setting.yaml] [--tracker PATH] [--watch --interval 15m]
+        python -m payout serve [--config cfg/setting.yaml] [--host 127.0.0.1] [--port 8502]
+
+    Parses the trackers, prices them and publishes a new snapshot version when anything changed,
+    once or every `--interval` with `--watch`. With `dashboard.ingest: false` in setting.yaml the
+    Streamlit app only reads the snapshots this worker publishes. `serve` answers the read-only
+    JSON API of payout.api from the published snapshots, next to the worker or the dashboard
+"""
+import argparse, os, re, sys, time, traceback
+import yaml
+from . import api
+from .calculator import payout_calculator
+from .manager import snapshot_manager
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def seconds(text):
+    # "90", "90s", "15m", "1h" -> seconds
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", text)
+    if m is None:
+        raise argparse.ArgumentTypeError(f"not an interval: {text}")
+    return float(m.group(1)) * UNITS[m.group(2) or 's']
+
+def log(message):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+def ingest(cfg, tracker=None):
+    start = time.perf_counter()
+    # one ingest at a time with the dashboards, skipped when one of them just published.
+    # Stale prices are fetched before publishing, a background refresh would die with the process
+    calc = snapshot_manager.shared().exclusive(lambda: payout_calculator(cfg, tracker, background=False))
+    if calc is None:
+        log("ingest skipped, another process published meanwhile")
+        return
+    state = f"published version {calc.version}" if calc.published else f"unchanged, version {calc.version}"
+    log(f"ingest {state} in {time.perf_counter() - start:.2f}s")
+
+def serve(cfg, host=None, port=None):
+    with open(cfg, 'rb') as stream:
+        api_cfg = (yaml.safe_load(stream) or {}).get('api') or {}
+    server = api.payout_api().serve(host or api_cfg.get('host') or api.HOST, port or api_cfg.get('port') or api.PORT)
+    log(f"JSON API on http://{server.server_address[0]}:{server.server_address[1]}/api/totals")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        return 0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m payout", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = ap.add_subparsers(dest='command', required=True)
+    cmd = commands.add_parser('ingest', help="parse, price and publish a snapshot")
+    cmd.add_argument('--config', default=os.path.join('cfg', 'setting.yaml'))
+    cmd.add_argument('--tracker', default=None, help="tracker file, folder, glob or URL, tracker.path of the config by default")
+    cmd.add_argument('--watch', action='store_true', help="keep running, one ingest every --interval")
+    cmd.add_argument('--interval', type=seconds, default=seconds('15m'), help="e.g. 90s, 15m, 1h (default 15m)")
+    cmd = commands.add_parser('serve', help="read-only JSON API of the published snapshot")
+    cmd.add_argument('--config', default=os.path.join('cfg', 'setting.yaml'))
+    cmd.add_argument('--host', default=None, help=f"api.host of the config, {api.HOST} by default")
+    cmd.add_argument('--port', type=int, default=None, help=f"api.port of the config, {api.PORT} by default")
+    args = ap.parse_args(argv)
+
+    cfg = os.path.abspath(args.config)
+    if args.command == 'serve':
+        return serve(cfg, args.host, args.port)
+    if not args.watch:
+        ingest(cfg, args.tracker)
+        return 0
+    while True:
+        started = time.monotonic()
+        try:
+            ingest(cfg, args.tracker)
+        except KeyboardInterrupt:
+            return 0
+        except Exception:
+            # keep the last published snapshot and try again next interval
+            log("ingest failed")
+            traceback.print_exc()
+        try:
+            time.sleep(max(0, args.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
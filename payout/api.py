@@ -0,0 +1,203 @@
+"""
+    Read-only JSON API of the published snapshot, beside the dashboard
+
+        GET /api/totals   total, per year and per token
+        GET /api/chains   per chain total and its tokens
+        GET /api/sankey   Total -> Year -> Blockchain -> Tokens nodes and links
+        GET /api/version  manifest of the published snapshot
+
+    Filters: ?year=2022&chain=SOLANA,NEAR-CHAIN&token=SOL&contributor=alice (repeated or comma
+    separated), ?currency=eur for one of price.currencies. Answers come from the snapshot the
+    dashboard sessions of the process share (see snapshot_manager), carry an ETag of the
+    snapshot version and are gzipped when the client accepts it. Nothing is parsed or priced
+"""
+import gzip, hashlib, json, threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+from . import snapshot, charts, currency
+from .cube import payout_cube
+from .table import table_index
+from .manager import snapshot_manager
+
+HOST = "127.0.0.1"
+PORT = 8502
+CACHED = 256 # encoded answers kept, newest first
+FILTERS = {'year': 'Year', 'chain': 'Blockchain', 'token': 'Tokens', 'contributor': 'Contributor'}
+
+class api_error(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def totals(cube):
+    return {
+        'total': cube.total(),
+        'by_year': {str(y): v for y, v in cube.by_year().items()},
+        'by_token': dict(zip(cube.tokens, cube.values.sum(axis=(0, 1)).tolist())),
+    }
+
+def chains(cube):
+    chain_token = cube.chain_token()
+    return {'chains': [
+        {'chain': chain, 'total': total, 'tokens': chain_token.loc[chain].dropna().to_dict()}
+        for chain, total in cube.by_chain().items()
+    ]}
+
+def sankey(cube):
+    return cube.sankey()
+
+ENDPOINTS = {
+    '/api/totals': totals,
+    '/api/chains': chains,
+    '/api/sankey': sankey,
+}
+
+class payout_api():
+    """
+        The endpoints of the module doc over `manager` (the process wide snapshot_manager by
+        default). `answer` is all of it without HTTP, `serve` runs it on a port
+    """
+    def __init__(self, manager=None):
+        self.manager = manager or snapshot_manager.shared()
+        self.lock = threading.Lock()
+        self.cache = OrderedDict() # (version, path, query) -> (etag, body, gzipped body)
+
+    def frame(self, version, cur, published):
+        # the frames, cubes and indexes of the dashboard, shared with it under the same names
+        if cur == currency.BASE.upper():
+            return self.manager.frame(version)
+        factor = published['fx'][cur.lower()]
+        return self.manager.get(version, ('frame', cur), lambda: currency.rescale(self.manager.frame(version), factor))
+
+    def cube(self, version, cur, published, filters):
+        if not filters:
+            return self.manager.get(version, ('cube', cur), lambda: payout_cube(self.frame(version, cur, published), currency=cur))
+        build = lambda: table_index(self.frame(version, cur, published), filters=tuple(FILTERS.values()))
+        index = self.manager.get(version, ('api.index', cur), build)
+        selected = dict()
+        names = {col: key for key, col in FILTERS.items()}
+        for col, values in filters.items():
+            by_name = {str(v): v for v in index.options(col)}
+            unknown = [v for v in values if v not in by_name]
+            if unknown:
+                raise api_error(400, f"unknown {names[col]} {', '.join(unknown)}, use one of {', '.join(by_name)}")
+            selected[col] = [by_name[v] for v in values]
+        df = index.df.iloc[index.select(**selected)]
+        # only the years/chains/tokens left after filtering
+        df = df.assign(**{col: df[col].cat.remove_unused_categories() for col in FILTERS.values()})
+        return payout_cube(df, currency=cur)
+
+    def query(self, query):
+        # (currency, {column: [values]}) of the query string
+        cur, filters = currency.BASE.upper(), dict()
+        for key, value in parse_qsl(query):
+            if key == 'currency':
+                cur = value.upper()
+            elif key in FILTERS:
+                filters.setdefault(FILTERS[key], []).extend(v.strip() for v in value.split(',') if v.strip())
+            else:
+                raise api_error(400, f"unknown parameter {key}, use currency or {', '.join(FILTERS)}")
+        return cur, filters
+
+    def answer(self, path, query=''):
+        """
+            (etag, body, gzipped body) of GET path?query, the body being compact JSON bytes.
+            Raises api_error with the HTTP status to answer otherwise
+        """
+        published = snapshot.manifest()
+        if published is None:
+            raise api_error(503, "no snapshot published yet")
+        version = published['version']
+        if path == '/api/version':
+            return self.encoded(published, hashlib.sha256(self.encode(published)).hexdigest()[:12])
+        if path not in ENDPOINTS:
+            raise api_error(404, f"no such endpoint, use {', '.join(list(ENDPOINTS) + ['/api/version'])}")
+        key = (version, path, query)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        cur, filters = self.query(query)
+        if cur.lower() not in (published.get('fx') or {currency.BASE: None}):
+            raise api_error(400, f"unknown currency {cur}, use one of {', '.join(c.upper() for c in published.get('fx') or [currency.BASE])}")
+        data = ENDPOINTS[path](self.cube(version, cur, published, filters))
+        # one tag per version and query, a poller gets 304 until the next publish
+        found = self.encoded({'version': version, 'currency': cur, **charts.rounded(data, currency.decimals(cur))},
+                             f"{version}-{hashlib.sha256(f'{path}?{query}'.encode('utf-8')).hexdigest()[:12]}")
+        with self.lock:
+            self.cache[key] = found
+            while len(self.cache) > CACHED:
+                self.cache.popitem(last=False)
+        return found
+
+    @staticmethod
+    def encode(data):
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def encoded(self, data, tag):
+        body = self.encode(data)
+        return f'"{tag}"', body, gzip.compress(body, compresslevel=6)
+
+    def handler(self):
+        api = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive for pollers
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                try:
+                    etag, body, gzipped = api.answer(url.path.rstrip('/'), url.query)
+                except api_error as exc:
+                    body = api.encode({'error': str(exc)})
+                    self.send(exc.status, body, gzip.compress(body))
+                    return
+                if etag in [t.strip() for t in (self.headers.get('If-None-Match') or '').split(',')]:
+                    self.send(304, b'', b'', etag)
+                    return
+                self.send(200, body, gzipped, etag)
+
+            def send(self, status, body, gzipped, etag=None):
+                gzipped = 'gzip' in (self.headers.get('Accept-Encoding') or '') and len(body) != 0 and gzipped
+                if gzipped:
+                    body = gzipped
+                self.send_response(status)
+                if status != 304:
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    if gzipped:
+                        self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Cache-Control', 'no-cache') # revalidate with the ETag
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+        return handler
+
+    def serve(self, host=HOST, port=PORT):
+        """
+            Serve in a daemon thread, returns the server (server_address has the port)
+        """
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="payout-api", daemon=True).start()
+        return server
+
+_server = None
+_server_lock = threading.Lock()
+
+def serve_once(host=HOST, port=PORT):
+    """
+        Start the API of this process unless it runs already, streamlit executes app.py again
+        on every rerun. Returns the server
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = payout_api().serve(host, port)
+        return _server
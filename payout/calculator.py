@@ -0,0 +1,164 @@
+import hashlib, time
+import yaml
+import pandas as pd
+from .price import price_service, get_session, COINGECKO_URL
+from . import fetch
+from .price_cache import price_cache, CACHE_FILE, CACHE_TTL
+from .ingest import ingest_state, resolve_trackers, contributor_names, parse_trackers
+from . import snapshot
+from .ledger import payout_ledger
+from .history import price_history, HISTORY_DIR
+from . import remote, timing
+from . import currency
+
+def ingest_stamp(yml_f, setting, now=None):
+    """
+        Changes whenever an ingest of `yml_f` (parsed as `setting`) can find something new:
+        setting.yaml or a tracker file was written, a tracker was added or removed, and once
+        per price cache-ttl while the published prices are older than that or a tracker is
+        remote (asked again with a conditional GET)
+    """
+    now = time.time() if now is None else now
+    ttl = max(1, ((setting or {}).get('price') or {}).get('cache-ttl', CACHE_TTL))
+    trackers = resolve_trackers(((setting or {}).get('tracker') or {}).get('path', 'README.md'))
+    files = tuple((path, snapshot.version(path)) for path in [yml_f] + trackers if not remote.is_url(path))
+    priced_at = (snapshot.manifest() or {}).get('priced_at')
+    stale = priced_at is None or now - priced_at >= ttl or any(remote.is_url(path) for path in trackers)
+    return files, int(now // ttl) if stale else None
+
+class payout_calculator():
+    """
+        Calculate the total flipside payout from README.md, and tabulate it based on blockchains category.
+        Publishes the result as a new snapshot version, see snapshot.publish.
+        Every stage is timed, `timings` holds the spans and counters of the run.
+        With `background` false stale prices are fetched before publishing instead of in a
+        background thread, see price_cache
+    """
+    def __init__(self, yml_f, trk_f=None, background=True):
+        self.background = background
+        with timing.recording('ingest') as self.timings:
+            self.run(yml_f, trk_f)
+
+    def run(self, yml_f, trk_f):
+        self.state = ingest_state()
+        with timing.span('decode_yaml'):
+            self.decode_yaml(yml_f)
+        self.timings.log_file = (self.parsed_yaml.get('performance') or {}).get('log') or None
+        with timing.span('fetch_prices'):
+            self.prices = self.fetch_prices()
+        with timing.span('parse_in_f'):
+            self.ledger = self.parse_in_f(trk_f or self.tracker_cfg().get('path', 'README.md'))
+        if self.changed or snapshot.version(snapshot.LEDGER_FILE) is None:
+            with timing.span('write_ledger'):
+                snapshot.write(self.ledger, snapshot.LEDGER_FILE)
+        # nothing else to write when the trackers, setting.yaml and prices are all the same as last time
+        # (a snapshot published without its ledger is published again)
+        elif self.state.get('prices') == self.prices and self.state.get('fx') == self.fx and 'ledger' in (snapshot.manifest() or {}):
+            # the manifest only changes when the prices in use were fetched again
+            if (snapshot.manifest() or {}).get('priced_at') != self.priced_at():
+                snapshot.annotate(priced_at=self.priced_at())
+            self.version, self.published = snapshot.version(), False
+            self.state.save()
+            return
+        ledger = payout_ledger(self.ledger)
+        with timing.span('value_history'):
+            usd = self.value_history(ledger)
+        with timing.span('dataframe'):
+            df = self.dataframe(ledger.totals(), usd)
+        with timing.span('publish'):
+            self.version, self.published = snapshot.publish(df, ledger=snapshot.LEDGER_FILE, priced_at=self.priced_at(), fx=self.fx, prices=self.prices), True
+        self.state['prices'] = self.prices
+        self.state['fx'] = self.fx
+        self.state.save()
+
+    def decode_yaml(self, yml_f):
+        with open(yml_f, 'rb') as stream:
+            raw = stream.read()
+        self.config_hash = hashlib.sha256(raw).hexdigest()
+        try:
+            self.parsed_yaml = yaml.safe_load(raw)
+        except yaml.YAMLError as exc:
+            print (exc)
+
+    def fetch_prices(self):
+        price_cfg = self.parsed_yaml.get('price') or {}
+        url = price_cfg.get('url', COINGECKO_URL)
+        scheduler = fetch.fetch_scheduler(
+            [url] + list(price_cfg.get('fallback-urls') or []),
+            get_session(),
+            rate=price_cfg.get('rate', fetch.RATE),
+            burst=price_cfg.get('burst', fetch.BURST),
+            timeout=price_cfg.get('timeout', fetch.TIMEOUT),
+            retries=price_cfg.get('retries', fetch.RETRIES),
+            hedge=price_cfg.get('hedge-after', fetch.HEDGE)
+        )
+        self.service = price_service(self.parsed_yaml['API'], url=url, scheduler=scheduler)
+        cache = price_cache(
+            self.service,
+            path=price_cfg.get('cache-file', CACHE_FILE),
+            ttl=price_cfg.get('cache-ttl', CACHE_TTL),
+            currencies=[c.lower() for c in price_cfg.get('currencies') or []],
+            background=self.background
+        )
+        prices = cache.get()
+        self.price_info = cache.info # age and source of every price
+        # {currency: {token: factor}} of the display currencies, from the same cached fetch
+        self.fx = currency.factors(cache.matrix()) if len(cache.currencies) > 1 else {currency.BASE: {t: 1.0 for t in prices}}
+        return prices
+
+    def priced_at(self):
+        # unix time of the oldest price in use, as the cache stored it, None when nothing was ever priced
+        times = [info['time'] for info in self.price_info.values() if info['time'] is not None]
+        return min(times) if times else None
+
+    def value_history(self, ledger):
+        # {(contributor, year, chain, token): USD} at the price of each payout date, None unless price.history is on
+        price_cfg = self.parsed_yaml.get('price') or {}
+        if not price_cfg.get('history'):
+            return None
+        history = price_history(self.service, path=price_cfg.get('history-dir', HISTORY_DIR))
+        usd = history.value(ledger.income())
+        # no date or no price that far back: today's price, like before
+        current = ledger.df['Amount'] * ledger.df['Tokens'].map(self.prices).astype('float64')
+        return ledger.totals(usd.fillna(current))
+
+    def tracker_cfg(self):
+        return self.parsed_yaml.get('tracker') or {}
+
+    def parse_in_f(self, trk_f):
+        # trk_f: one tracker, a folder of trackers, a glob or an http(s) URL, one Contributor per file
+        self.blockchain_lst = list(self.parsed_yaml['blockchain-list'].keys())
+        trackers = resolve_trackers(trk_f)
+        if len(trackers) == 0:
+            raise FileNotFoundError(f"no tracker found at {trk_f}")
+        self.contributors = sorted(set(contributor_names(trackers).values()))
+        previous = lambda: snapshot.read_if_exists(snapshot.LEDGER_FILE)
+        ledger, self.state['trackers'], self.changed = parse_trackers(
+            trackers,
+            self.parsed_yaml['blockchain-list'],
+            self.parsed_yaml['year'],
+            self.config_hash,
+            self.state.get('trackers', {}),
+            previous,
+            workers=self.tracker_cfg().get('workers') or None
+        )
+        return ledger
+
+    def dataframe(self, totals, usd=None):
+        # every configured year/chain/token, 0 when the ledger has no income for it.
+        # With historical `usd`, Price is the average price the tokens were paid at
+        data = list()
+        for contributor in self.contributors:
+            for year in self.parsed_yaml['year']:
+                for chain in self.blockchain_lst:
+                    for denom in self.parsed_yaml['blockchain-list'][chain]:
+                        key = (contributor, year, chain, denom)
+                        amount = totals.get(key, 0)
+                        price = self.prices[denom]
+                        amount_usd = amount*price
+                        if usd is not None:
+                            amount_usd = usd.get(key, 0)
+                            price = amount_usd/amount if amount else price
+                        data.append([contributor, year, chain, denom, amount, price, round(amount_usd, 2)])
+        df = pd.DataFrame(data,columns=['Contributor','Year','Blockchain','Tokens','Amount','Price','Amount_USD'])
+        return snapshot.typed(df)
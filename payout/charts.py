@@ -0,0 +1,344 @@
+"""
+    ECharts option builders, each one takes a payout_cube and returns the options dict.
+    The income over time chart is built from a payout_timeline instead, see timeline_payload
+"""
+import json
+import numpy as np
+
+PALETTE = ["#0f488c", "#696cb5", "#e85e76", "#ef8a5a", "#f6b53d", "#15cab6", "#287e8f"]
+TEXT_COLOR = '#E6E6E6'
+MAX_SERIES = 12 # chains/tokens per chart before the smallest are folded into "Other"
+BUDGET = 32 * 1024 # bytes of compact JSON per chart
+PRECISION = 2 # decimals of the values, what the charts display (more for BTC, see currency.decimals)
+
+def series_color(n):
+    # chart series take the palette from the end, like the pie slices
+    return PALETTE[-1 - n % len(PALETTE)]
+
+def pie_options(cube):
+    # Total income slices by blockchain
+    gb_blockchain = cube.by_chain().sort_values()
+    wrap_bar = [{"value": value, "name": name} for name, value in gb_blockchain.items()]
+    return {
+        "title": {
+            "text": f"Total Income {cube.currency} Slices",
+            "left": "center",
+            "top": 5,
+            "textStyle": {"color": "#e6e6e6"},
+        },
+        "legend": {
+            "bottom": 5,
+            "left": 'center',
+            "textStyle": {"color": TEXT_COLOR},
+        },
+        "tooltip": {"trigger": "item", "formatter": "{a} <br/>{b} : {c} ({d}%)"},
+        "series": [
+            {
+                "name": "Access From",
+                "type": "pie",
+                "radius": ["45%", "70%"],
+                "avoidLabelOverlap": False,
+                "label": {
+                    "show": False,
+                    "position": "center"
+                },
+                "emphasis": {
+                    "label": {
+                        "show": True,
+                        "fontSize": "20",
+                        "fontWeight": "bold"
+                    }
+                },
+                "labelLine": {
+                    "show": False
+                },
+                "data": wrap_bar,
+                "color": PALETTE
+            }
+        ]
+    }
+
+def chain_bar_options(cube):
+    # Stacked tokens per blockchain
+    chain_token = cube.chain_token()
+    bar_series = list()
+    for n, token in enumerate(cube.tokens):
+        bar_series.append({
+            "name": token,
+            "type": "bar",
+            "stack": "total",
+            "label": {"show": True},
+            "emphasis": {"focus": "series"},
+            "data": list(chain_token[token].fillna(0)),
+            "color": series_color(n),
+        })
+    return {
+        "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
+        "title": {
+            "text": f"Total Income {cube.currency} by Blockchain",
+            "textStyle": {"color": TEXT_COLOR},
+            "left": "center",
+        },
+        "legend": {
+            "data": cube.tokens,
+            "textStyle": {"color": TEXT_COLOR},
+            "bottom": 5,
+            "left": 'center',
+        },
+        "grid": {"left": "3%", "right": "4%", "bottom": "10%", "containLabel": True},
+        "xAxis": {
+            "type": "value",
+            "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+        },
+        "yAxis": {
+            "type": "category",
+            "data": cube.chains,
+            "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+        },
+        "series": bar_series,
+    }
+
+def year_bar_options(cube):
+    # Blockchains side by side per year
+    year_chain = cube.year_chain()
+    year_series = list()
+    for n, chain in enumerate(cube.chains):
+        year_series.append({
+            "name": chain,
+            "type": "bar",
+            "label": "labelOption",
+            "emphasis": {"focus": "series"},
+            "color": series_color(n),
+            "data": list(year_chain[chain])
+        })
+    return {
+        "tooltip": {
+            "trigger": "axis",
+            "axisPointer": {"type": "shadow"}
+        },
+        "title": {
+            "text": f"Total Income {cube.currency} by Years",
+            "textStyle": {"color": TEXT_COLOR},
+            "left": "center",
+        },
+        "legend": {
+            "textStyle": {"color": TEXT_COLOR},
+            "bottom": 5,
+            "left": 'center',
+            "data": cube.chains
+        },
+        "toolbox": {
+            "show": True,
+            "orient": "vertical",
+            "left": "right",
+            "top": "center",
+            "feature": {
+                "mark": {"show": True},
+                "dataView": {"show": True, "readOnly": False},
+                "magicType": {"show": True, "type": ["line", "bar", "stack"]},
+                "restore": {"show": True},
+                "saveAsImage": {"show": True}
+            }
+        },
+        "xAxis": [
+            {
+                "type": "category",
+                "axisTick": {"show": False},
+                "data": [str(y) for y in cube.years],
+                "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+            }
+        ],
+        "yAxis": [
+            {
+                "axisLabel": {"textStyle": {"color": TEXT_COLOR}},
+                "type": "value"
+            }
+        ],
+        "series": year_series
+    }
+
+def sankey_options(cube):
+    # Total -> Year -> Blockchain -> Tokens
+    sankey = cube.sankey()
+    return {
+        "title": {
+            "text": "Total Income Sankey",
+            "textStyle": {"color": TEXT_COLOR},
+            "left": "center",
+        },
+        "tooltip": {"trigger": "item", "triggerOn": "mousemove"},
+        "series": [
+            {
+                "type": "sankey",
+                "data": sankey["nodes"],
+                "links": sankey["links"],
+                "emphasis": {"focus": "adjacency"},
+                "levels": [
+                    {
+                        "depth": 0,
+                        "itemStyle": {"color": "#287e8f"},
+                        "lineStyle": {"color": "source", "opacity": 0.6},
+                    },
+                    {
+                        "depth": 1,
+                        "itemStyle": {"color": "#15cab6"},
+                        "lineStyle": {"color": "source", "opacity": 0.6},
+                    },
+                    {
+                        "depth": 2,
+                        "itemStyle": {"color": "#f6b53d"},
+                        "lineStyle": {"color": "source", "opacity": 0.6},
+                    },
+                    {
+                        "depth": 3,
+                        "itemStyle": {"color": "#ef8a5a"},
+                        "lineStyle": {"color": "source", "opacity": 0.6},
+                    },
+                ],
+                "lineStyle": {"curveness": 0.5},
+            }
+        ],
+    }
+
+def timeline_options(series, running, currency):
+    # Stacked income per month/week and chain (or token), running total on the second axis
+    bar_series = list()
+    for n, name in enumerate(series.columns):
+        bar_series.append({
+            "name": name,
+            "type": "bar",
+            "stack": "total",
+            "emphasis": {"focus": "series"},
+            "color": series_color(n),
+            "data": list(series[name]),
+        })
+    bar_series.append({
+        "name": "Cumulative",
+        "type": "line",
+        "yAxisIndex": 1,
+        "showSymbol": False,
+        "color": PALETTE[0],
+        "data": list(running),
+    })
+    return {
+        "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
+        "title": {
+            "text": f"Income {currency} over Time",
+            "textStyle": {"color": TEXT_COLOR},
+            "left": "center",
+        },
+        "legend": {
+            "textStyle": {"color": TEXT_COLOR},
+            "bottom": 5,
+            "left": 'center',
+            "data": list(series.columns) + ["Cumulative"],
+        },
+        "grid": {"left": "3%", "right": "4%", "bottom": "12%", "containLabel": True},
+        "xAxis": {
+            "type": "category",
+            "data": list(series.index),
+            "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+        },
+        "yAxis": [
+            {"type": "value", "axisLabel": {"textStyle": {"color": TEXT_COLOR}}},
+            {"type": "value", "splitLine": {"show": False}, "axisLabel": {"textStyle": {"color": TEXT_COLOR}}},
+        ],
+        "series": bar_series,
+    }
+
+def timeline_payload(timeline, start, end, freq='Month', by='chains', max_series=MAX_SERIES, precision=PRECISION):
+    """
+        (options, bytes) of the income over time between `start` and `end`, the chains (or
+        tokens) beyond `max_series` summed into "Other chains" ("Other tokens")
+    """
+    series = timeline.series(start, end, freq, by)
+    running = series.sum(axis=1).cumsum()
+    if len(series.columns) > max_series:
+        keep = series.sum().sort_values(ascending=False, kind='stable').index[:max(max_series - 1, 0)]
+        rest = [c for c in series.columns if c not in keep]
+        series = series[[c for c in series.columns if c in keep]].assign(**{f"Other {by}": series[rest].sum(axis=1)})
+    options = rounded(timeline_options(series, running, timeline.currency), precision)
+    return options, payload_size(options)
+
+def histogram_options(outcomes, current, currency, bins=40):
+    # How many price scenarios end at which total income, the current prices marked
+    counts, edges = np.histogram(outcomes, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return {
+        "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
+        "title": {
+            "text": f"Total Income {currency} over {len(outcomes)} Price Scenarios",
+            "textStyle": {"color": TEXT_COLOR},
+            "left": "center",
+        },
+        "grid": {"left": "3%", "right": "4%", "bottom": "5%", "containLabel": True},
+        "xAxis": {
+            "type": "value",
+            "min": float(edges[0]),
+            "max": float(edges[-1]),
+            "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+        },
+        "yAxis": {
+            "type": "value",
+            "name": "scenarios",
+            "axisLabel": {"textStyle": {"color": TEXT_COLOR}}
+        },
+        "series": [{
+            "name": "Scenarios",
+            "type": "bar",
+            "barWidth": "95%",
+            "color": PALETTE[-2],
+            "data": [[x, int(c)] for x, c in zip(centers, counts)],
+            "markLine": {
+                "symbol": "none",
+                "label": {"formatter": "current", "color": TEXT_COLOR},
+                "lineStyle": {"color": PALETTE[3]},
+                "data": [{"xAxis": current}],
+            },
+        }],
+    }
+
+# every chart of the dashboard, in render order
+BUILDERS = {
+    'pie': pie_options,
+    'chain_bar': chain_bar_options,
+    'year_bar': year_bar_options,
+    'sankey': sankey_options,
+}
+
+def rounded(options, precision=PRECISION):
+    # every float rounded to `precision` decimals, numpy scalars as plain numbers
+    if isinstance(options, dict):
+        return {k: rounded(v, precision) for k, v in options.items()}
+    if isinstance(options, (list, tuple)):
+        return [rounded(v, precision) for v in options]
+    if isinstance(options, float) or hasattr(options, 'dtype'):
+        value = round(float(options), precision)
+        return int(value) if value.is_integer() else value
+    return options
+
+def payload_size(options):
+    # bytes of the options as compact JSON, about what is sent to the chart iframe
+    return len(json.dumps(options, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def build_payload(build, cube, max_series=MAX_SERIES, budget=BUDGET, precision=PRECISION):
+    """
+        (options, bytes) of one chart: at most `max_series` chains and tokens, fewer until the
+        payload fits in `budget` bytes, floats rounded to `precision`
+    """
+    n = min(max_series, max(len(cube.chains), len(cube.tokens)))
+    while True:
+        options = rounded(build(cube.folded(n, n)), precision)
+        size = payload_size(options)
+        if size <= budget or n <= 2:
+            return options, size
+        n = max(2, n * 2 // 3)
+
+def build_all(cube, max_series=MAX_SERIES, budget=BUDGET, precision=PRECISION):
+    """
+        ({chart: options}, {chart: bytes}) of every chart
+    """
+    options, sizes = dict(), dict()
+    for name, build in BUILDERS.items():
+        options[name], sizes[name] = build_payload(build, cube, max_series, budget, precision)
+    return options, sizes
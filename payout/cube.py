@@ -0,0 +1,91 @@
+import copy
+import numpy as np
+import pandas as pd
+
+OTHER_CHAINS = "Other chains"
+OTHER_TOKENS = "Other tokens"
+
+class payout_cube():
+    """
+        Year x Blockchain x Tokens totals of the payout frame, computed once per snapshot version.
+        `present` marks the cells that exist in the frame (a token paid out on that chain),
+        every chart and metric card reads its numbers from here. `currency` is the unit of `value`
+    """
+    def __init__(self, df, value='Amount_USD', currency='USD'):
+        self.currency = currency
+        axes, codes = list(), list()
+        for col in ['Year', 'Blockchain', 'Tokens']:
+            cat = df[col].astype('category').cat
+            axes.append(cat.categories.tolist())
+            codes.append(cat.codes.to_numpy())
+        self.years, self.chains, self.tokens = axes
+        shape = (len(self.years), len(self.chains), len(self.tokens))
+        self.values = np.zeros(shape)
+        np.add.at(self.values, tuple(codes), df[value].to_numpy(dtype='float64'))
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[tuple(codes)] = True
+
+        # tokens in order of the first chain paying them (ETH, USDC, NEAR, ...) rather than alphabetical
+        paid_on = self.present.any(axis=0)
+        first = np.where(paid_on.any(axis=0), paid_on.argmax(axis=0) if len(self.chains) else 0, len(self.chains)) # no chains: a filter left nothing
+        order = np.argsort(first, kind='stable')
+        self.tokens = [self.tokens[n] for n in order]
+        self.values = self.values[:, :, order]
+        self.present = self.present[:, :, order]
+
+    def folded(self, max_chains, max_tokens):
+        """
+            Copy keeping the largest chains and tokens, at most `max_chains`/`max_tokens` including
+            the "Other chains"/"Other tokens" bucket the rest is summed into. Kept ones stay in order
+        """
+        cube = copy.copy(self)
+        for axis, names, limit, other in ((1, 'chains', max_chains, OTHER_CHAINS), (2, 'tokens', max_tokens, OTHER_TOKENS)):
+            labels = getattr(cube, names)
+            if len(labels) <= limit:
+                continue
+            totals = cube.values.sum(axis=tuple(a for a in (0, 1, 2) if a != axis))
+            keep = np.sort(np.argsort(-totals, kind='stable')[:max(limit - 1, 0)])
+            rest = np.setdiff1d(np.arange(len(labels)), keep)
+            cube.values = np.concatenate([cube.values.take(keep, axis), cube.values.take(rest, axis).sum(axis=axis, keepdims=True)], axis=axis)
+            cube.present = np.concatenate([cube.present.take(keep, axis), cube.present.take(rest, axis).any(axis=axis, keepdims=True)], axis=axis)
+            setattr(cube, names, [labels[n] for n in keep] + [other])
+        return cube
+
+    def total(self):
+        return float(self.values.sum())
+
+    def by_year(self):
+        return pd.Series(self.values.sum(axis=(1, 2)), index=self.years)
+
+    def by_chain(self):
+        return pd.Series(self.values.sum(axis=(0, 2)), index=self.chains)
+
+    def year_chain(self):
+        # years x chains
+        return pd.DataFrame(self.values.sum(axis=2), index=self.years, columns=self.chains)
+
+    def chain_token(self):
+        # chains x tokens, NaN where the chain never pays the token
+        table = self.values.sum(axis=0)
+        return pd.DataFrame(np.where(self.present.any(axis=0), table, np.nan), index=self.chains, columns=self.tokens)
+
+    def sankey(self):
+        """
+            Nodes and links of Total -> Year -> Blockchain -> Tokens
+        """
+        nodes = [{'name': 'Total'}]
+        nodes += [{'name': str(y)} for y in self.years]
+        nodes += [{'name': c} for c in self.chains]
+        nodes += [{'name': t} for t in self.tokens]
+        links = list()
+        year_chain = self.values.sum(axis=2)
+        for i, y in enumerate(self.years):
+            links.append({'source': 'Total', 'target': str(y), 'value': float(year_chain[i].sum())})
+            for j, c in enumerate(self.chains):
+                if self.present[i, j].any():
+                    links.append({'source': str(y), 'target': c, 'value': float(year_chain[i, j])})
+        chain_token = self.chain_token()
+        for c in self.chains:
+            for t, v in chain_token.loc[c].dropna().items():
+                links.append({'source': c, 'target': t, 'value': float(v)})
+        return {'nodes': nodes, 'links': links}
@@ -0,0 +1,31 @@
+"""
+    Display currencies. The payout frame is priced in USD once, other currencies are a per-token
+    factor (price in the currency / price in USD) applied to its Price and Amount_USD columns
+"""
+import numpy as np
+
+BASE = 'usd'
+DECIMALS = {'btc': 8, 'eth': 6, 'sats': 0} # display precision, 2 for the others
+
+def decimals(currency):
+    return DECIMALS.get(currency.lower(), 2)
+
+def factors(matrix, base=BASE):
+    """
+        {currency: {token: factor}} of a {currency: {token: price}} matrix, 0 where a price is missing
+    """
+    usd = matrix[base]
+    return {
+        currency: {token: (prices.get(token) or 0) / usd[token] if usd.get(token) else 0.0 for token in usd}
+        for currency, prices in matrix.items()
+    }
+
+def rescale(df, factor):
+    """
+        Copy of the payout frame with Price and Amount_USD in another currency, `factor` being
+        its {token: factor}: one vectorized multiply by the factor of every row's token
+    """
+    tokens = df['Tokens'].astype('category').cat
+    per_token = np.array([factor.get(t) or 0.0 for t in tokens.categories] + [0.0]) # code -1 (no token) -> 0
+    scale = per_token[tokens.codes.to_numpy()]
+    return df.assign(Price=df['Price'].to_numpy() * scale, Amount_USD=df['Amount_USD'].to_numpy() * scale)
@@ -0,0 +1,145 @@
+import random, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from . import timing
+
+RATE = 0.5 # requests per second and provider, CoinGecko's free tier allows ~30 a minute
+BURST = 5
+TIMEOUT = 10 # seconds, connect and read
+RETRIES = 4
+BACKOFF = 1 # seconds, doubled on every retry
+MAX_BACKOFF = 30
+HEDGE = 2 # seconds without an answer before the next provider is asked as well
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class token_bucket():
+    """
+        `rate` requests per second with bursts of up to `burst`, thread safe
+    """
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def configure(self, rate, burst):
+        # new limits, the tokens saved up so far are kept up to the new burst
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(burst, self.burst, self.tokens + (now - self.time) * self.rate)
+            self.time = now
+            self.rate = rate
+            self.burst = burst
+
+    def acquire(self):
+        # block until a token is free and take it
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.time) * self.rate)
+                self.time = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_buckets = dict()
+_buckets_lock = threading.Lock()
+
+def shared_bucket(url, rate=RATE, burst=BURST):
+    """
+        One token bucket per provider url and process, shared by every session and thread.
+        A `rate`/`burst` edited in setting.yaml applies to it from the next request on
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(url)
+        if bucket is None:
+            bucket = _buckets[url] = token_bucket(rate, burst)
+        elif (bucket.rate, bucket.burst) != (rate, burst):
+            bucket.configure(rate, burst)
+        return bucket
+
+class fetch_scheduler():
+    """
+        GET JSON from an ordered list of CoinGecko compatible providers.
+        Every request waits for its provider's token bucket and has a timeout, 429 and 5xx
+        answers are retried with exponential backoff and full jitter (or Retry-After when the
+        provider sends it). The first provider is asked first, the next one joins in parallel
+        when it fails or has not answered within `hedge` seconds, the first good answer wins
+    """
+    def __init__(self, urls, session, rate=RATE, burst=BURST, timeout=TIMEOUT, retries=RETRIES,
+                 backoff=BACKOFF, max_backoff=MAX_BACKOFF, hedge=HEDGE):
+        self.urls = [url.rstrip('/') for url in urls]
+        self.session = session
+        self.buckets = {url: shared_bucket(url, rate, burst) for url in self.urls}
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+
+    def delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after is not None and retry_after.strip().isdigit():
+            return min(self.max_backoff, int(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, url, path, params):
+        """
+            JSON of one provider, None when it keeps failing or answers with another error
+        """
+        for attempt in range(self.retries + 1):
+            with timing.span('http.wait'):
+                self.buckets[url].acquire()
+            response = None
+            timing.count('http.requests')
+            try:
+                with timing.span('http.get'):
+                    response = self.session.get(f"{url}{path}", params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                timing.count('http.errors')
+            except requests.RequestException:
+                timing.count('http.errors')
+                return None
+            if response is not None:
+                timing.count(f"http.{response.status_code}")
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        return None
+                if response.status_code not in RETRY_STATUS:
+                    return None
+            if attempt < self.retries:
+                timing.count('http.retries')
+                with timing.span('http.backoff'):
+                    time.sleep(self.delay(attempt, response))
+        return None
+
+    def get(self, path, params=None):
+        """
+            JSON of the first provider that answers `path`, None when none of them does
+        """
+        if len(self.urls) == 1:
+            return self.request(self.urls[0], path, params)
+        pool = ThreadPoolExecutor(max_workers=len(self.urls), thread_name_prefix="price-fetch")
+        urls = iter(self.urls)
+        request = timing.bind(self.request) # pool threads count into this run
+        running = {pool.submit(request, next(urls), path, params)}
+        try:
+            while running:
+                done, running = wait(running, timeout=self.hedge, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result() is not None:
+                        return future.result()
+                # too slow or failed, ask the next provider too
+                url = next(urls, None)
+                if url is not None:
+                    timing.count('http.fallbacks')
+                    running.add(pool.submit(request, url, path, params))
+            return None
+        finally:
+            # a slower provider still running is left to finish within its timeout
+            pool.shutdown(wait=False, cancel_futures=True)
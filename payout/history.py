@@ -0,0 +1,100 @@
+import json, os, threading
+import pandas as pd
+
+HISTORY_DIR = "data/history"
+DAY = pd.Timedelta(days=1)
+
+def stored(cid, currency='usd', path=HISTORY_DIR):
+    # the daily prices of `cid` already on disk, nothing is fetched
+    try:
+        with open(os.path.join(path, f"{cid}-{currency}.json"), 'r', encoding='utf-8') as fp:
+            prices = pd.Series(json.load(fp)['prices'], dtype='float64')
+    except (OSError, ValueError, KeyError):
+        return pd.Series(dtype='float64')
+    prices.index = pd.to_datetime(prices.index)
+    return prices.sort_index()
+
+class price_history():
+    """
+        Daily price series per CoinGecko id, kept in data/history/<id>-<currency>.json with the
+        span of days already fetched. Only days outside that span are requested, with one
+        /market_chart/range call per missing span, and amounts are valued at their payout
+        date with an as-of join against the series
+    """
+    def __init__(self, service, path=HISTORY_DIR):
+        self.service = service
+        self.path = path
+
+    def file(self, cid):
+        return os.path.join(self.path, f"{cid}-{self.service.currency}.json")
+
+    def load(self, cid):
+        try:
+            with open(self.file(cid), 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {'start': None, 'end': None, 'prices': {}}
+
+    def save(self, cid, data):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f"{self.file(cid)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp)
+        os.replace(tmp, self.file(cid))
+
+    def missing(self, data, start, end):
+        # spans of [start, end] outside the fetched span, at most one before and one after it
+        if data['start'] is None:
+            return [(start, end)]
+        have_start, have_end = pd.Timestamp(data['start']), pd.Timestamp(data['end'])
+        spans = list()
+        if start < have_start:
+            spans.append((start, have_start - DAY))
+        if end > have_end:
+            spans.append((have_end + DAY, end))
+        return spans
+
+    def series(self, cid, start, end):
+        """
+            Daily prices of `cid` covering [start, end] (normalized dates), fetching what is missing
+        """
+        data = self.load(cid)
+        changed = False
+        for lo, hi in self.missing(data, start, end):
+            points = self.service.fetch_range(cid, lo.timestamp(), (hi + DAY).timestamp())
+            if points is None:
+                continue # the gap is requested again next time
+            for ms, price in points:
+                day = pd.Timestamp(ms, unit='ms').strftime('%Y-%m-%d')
+                data['prices'].setdefault(day, price) # first point of the day
+            data['start'] = min(filter(None, [data['start'], lo.strftime('%Y-%m-%d')]))
+            data['end'] = max(filter(None, [data['end'], hi.strftime('%Y-%m-%d')]))
+            changed = True
+        if changed:
+            self.save(cid, data)
+        prices = pd.Series(data['prices'], dtype='float64')
+        prices.index = pd.to_datetime(prices.index)
+        return prices.sort_index()
+
+    def value(self, rows):
+        """
+            Amount x price at Date for every row of `rows` (ledger rows with Tokens/Date/Amount),
+            NaN where the date or a price before it is unknown
+        """
+        dated = rows[rows['Date'].notna() & rows['Tokens'].notna()]
+        left = pd.DataFrame({
+            'Date': dated['Date'].astype('datetime64[ns]').dt.normalize(),
+            'Tokens': dated['Tokens'].astype(str),
+            'row': dated.index,
+        })
+        right = list()
+        for token, dates in left.groupby('Tokens')['Date']:
+            cid = str(self.service.api[token]).lower()
+            prices = self.series(cid, dates.min(), dates.max())
+            right.append(pd.DataFrame({'Date': prices.index.astype('datetime64[ns]'), 'Tokens': token, 'price': prices.to_numpy()}))
+        usd = pd.Series(float('nan'), index=rows.index)
+        if len(right) == 0:
+            return usd
+        joined = pd.merge_asof(left.sort_values('Date'), pd.concat(right).sort_values('Date'), on='Date', by='Tokens')
+        usd.loc[joined['row'].to_numpy()] = joined['price'].to_numpy() * rows.loc[joined['row'].to_numpy(), 'Amount'].to_numpy()
+        return usd
@@ -0,0 +1,293 @@
+import glob, hashlib, itertools, json, os
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from .tracker import tracker_parser
+from .ledger import ledger_frame, concat
+from . import remote, timing
+
+STATE_FILE = "data/ingest_state.json"
+class ingest_state():
+    """
+        What the last ingest read, kept in data/ingest_state.json. Only written when it changed
+    """
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fp:
+                self.data = json.load(fp)
+        except (OSError, ValueError):
+            self.data = dict()
+        self.saved = self.dumps()
+
+    def dumps(self):
+        return json.dumps(self.data, sort_keys=True)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def save(self):
+        if self.dumps() == self.saved and os.path.exists(self.path):
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(self.data, fp)
+        os.replace(tmp, self.path)
+        self.saved = self.dumps()
+
+class incremental_parser():
+    """
+        Parse a tracker only as far as needed. The checkpoint of the last parse records the byte
+        offset of the last complete line, the hash of everything before it, the parser state
+        there and how many ledger rows came before it. When that prefix is unchanged only the
+        appended lines are parsed and added to the previous ledger, any other edit (or a new
+        setting.yaml) falls back to a full parse.
+        `mode` tells which path was taken: 'unchanged', 'append' or 'full'
+    """
+    def __init__(self, chain_denoms, years, config_hash):
+        self.chain_denoms = chain_denoms
+        self.years = years
+        self.config_hash = config_hash
+        self.mode = None
+
+    def lines(self, fp, h, cp):
+        # complete lines only, the offset/prefix hash advance with them
+        for raw in fp:
+            if not raw.endswith(b'\n'):
+                self.partial = raw
+                return
+            h.update(raw)
+            cp['offset'] += len(raw)
+            yield raw.decode('utf-8')
+
+    def scan(self, trk_f, prev=None):
+        """
+            Parse what is new since checkpoint `prev` and return (rows, checkpoint), `rows` being
+            the ledger of the parsed part only. After an 'append' or 'unchanged' scan the first
+            `base` rows of the previous ledger are still valid and come before `rows`
+        """
+        parser = tracker_parser(self.chain_denoms, self.years)
+        h = hashlib.sha256()
+        stat = os.stat(trk_f)
+        cp = {'config': self.config_hash, 'path': os.path.abspath(trk_f), 'offset': 0, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        self.base = 0
+        self.partial = b''
+        self.mode = 'full'
+        with open(trk_f, 'rb') as fp:
+            if prev and prev.get('config') == self.config_hash and prev.get('path') == cp['path']:
+                prefix = fp.read(prev['offset'])
+                h.update(prefix)
+                if len(prefix) == prev['offset'] and h.hexdigest() == prev['prefix']:
+                    parser.restore(prev['parser'])
+                    cp['offset'] = prev['offset']
+                    self.base = prev['parser']['rows']
+                    self.mode = 'append'
+                else:
+                    fp.seek(0)
+                    h = hashlib.sha256()
+            parser.parse(self.lines(fp, h, cp))
+        return self.finish(parser, h, cp, prev)
+
+    def scan_remote(self, url, response, prev=None):
+        """
+            `scan` of the body of `response` (see remote.fetch), parsed as it streams in. The
+            lines up to the checkpoint offset are held back until their hash is known, an
+            unchanged prefix is skipped like in a local file
+        """
+        parser = tracker_parser(self.chain_denoms, self.years)
+        h = hashlib.sha256()
+        cp = {'config': self.config_hash, 'path': url, 'offset': 0, **remote.validators(response)}
+        self.base = 0
+        self.partial = b''
+        self.mode = 'full'
+        stream = remote.lines(response)
+        head = list()
+        if prev and prev.get('config') == self.config_hash and prev.get('path') == url:
+            size = 0
+            for raw in stream:
+                head.append(raw)
+                size += len(raw)
+                if size >= prev['offset']:
+                    break
+            prefix = b''.join(head)
+            if size == prev['offset'] and hashlib.sha256(prefix).hexdigest() == prev['prefix']:
+                h.update(prefix)
+                parser.restore(prev['parser'])
+                cp['offset'] = prev['offset']
+                self.base = prev['parser']['rows']
+                self.mode = 'append'
+                head = list()
+        parser.parse(self.lines(itertools.chain(head, stream), h, cp))
+        return self.finish(parser, h, cp, prev)
+
+    def finish(self, parser, h, cp, prev):
+        cp['prefix'] = h.hexdigest()
+        cp['parser'] = parser.checkpoint()
+        cp['parser']['rows'] += self.base
+        h.update(self.partial)
+        cp['hash'] = h.hexdigest()
+        if self.mode == 'append' and cp['hash'] == prev.get('hash'):
+            self.mode = 'unchanged'
+        # a last line without newline counts now but is parsed again once it is complete
+        parser.parse([self.partial.decode('utf-8')] if self.partial else [])
+        return ledger_frame(parser.rows), cp
+
+    def merge(self, rows, old):
+        # the full ledger of the last scan, None when `old` can't be reused
+        if self.mode == 'full':
+            return rows
+        if old is None or len(old) < self.base:
+            return None
+        if self.mode == 'unchanged':
+            return old
+        return concat([old.iloc[:self.base], rows])
+
+    def parse(self, trk_f, prev=None, previous=None):
+        """
+            Return (ledger, checkpoint). `prev` is the checkpoint of the previous call and
+            `previous()` loads the ledger it returned (None when it is gone)
+        """
+        rows, cp = self.scan(trk_f, prev if previous else None)
+        ledger = self.merge(rows, previous() if self.mode != 'full' else None)
+        if ledger is None:
+            return self.parse(trk_f)
+        return ledger, cp
+
+def resolve_trackers(trk_f):
+    """
+        Tracker files of `trk_f`: a file, a directory (every *.md in it, recursively), a glob
+        pattern or an http(s) URL
+    """
+    if remote.is_url(trk_f):
+        return [trk_f]
+    if os.path.isfile(trk_f):
+        return [os.path.abspath(trk_f)]
+    if os.path.isdir(trk_f):
+        trk_f = os.path.join(trk_f, '**', '*.md')
+    return sorted(os.path.abspath(f) for f in glob.glob(trk_f, recursive=True) if os.path.isfile(f))
+
+def contributor_names(paths):
+    """
+        {path: contributor}, the file name without .md, or the folder name for README.md files
+        (the last folder of the URL path for a remote tracker).
+        Duplicates get their parent folders prepended until they are unique
+    """
+    def name(path, depth):
+        if remote.is_url(path):
+            url = urlparse(path)
+            parts = [url.netloc] + [p for p in os.path.splitext(url.path)[0].split('/') if p]
+        else:
+            parts = os.path.splitext(path)[0].split(os.sep)
+        if parts[-1].lower() == 'readme' and len(parts) > 1:
+            parts = parts[:-1]
+        return '/'.join(parts[-depth:])
+    depth = {p: 1 for p in paths}
+    while True:
+        names = {p: name(p, depth[p]) for p in paths}
+        seen = dict()
+        for p, n in names.items():
+            seen.setdefault(n, []).append(p)
+        clashes = [p for group in seen.values() if len(group) > 1 for p in group]
+        if not clashes:
+            return names
+        for p in clashes:
+            depth[p] += 1
+
+def scan_tracker(job, response=None):
+    # process pool entry point, one tracker per call. A remote one is downloaded unless its `response` is open already
+    chain_denoms, years, config_hash, path, prev = job
+    parser = incremental_parser(chain_denoms, years, config_hash)
+    if remote.is_url(path):
+        with response or remote.fetch(path) as body:
+            rows, cp = parser.scan_remote(path, body, prev)
+    else:
+        rows, cp = parser.scan(path, prev)
+    return parser.mode, parser.base, rows, cp
+
+def parse_trackers(paths, chain_denoms, years, config_hash, checkpoints, previous, workers=None):
+    """
+        Ledger of every tracker in `paths` with a Contributor column, and their new checkpoints.
+        Files whose size and mtime match their checkpoint are not read at all, the others are
+        scanned in parallel in a process pool and merged with their rows from `previous()`,
+        the combined ledger of the last call. Remote trackers (URLs) are asked for with the
+        validators of their checkpoint, a 304 counts as unchanged and a new body is parsed while
+        it downloads. When nothing changed `previous()` is returned as is.
+        Returns (ledger, checkpoints, changed)
+    """
+    names = contributor_names(paths)
+    jobs = list()
+    kept = dict()
+    responses = dict() # remote trackers that changed, their body is parsed as it is downloaded
+    for path in paths:
+        prev = checkpoints.get(path)
+        if remote.is_url(path):
+            response = remote.fetch(path, prev if prev and prev.get('config') == config_hash else None)
+            if response is None:
+                kept[path] = prev
+            else:
+                responses[path] = response
+                jobs.append((chain_denoms, years, config_hash, path, prev))
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if prev and prev.get('config') == config_hash and prev.get('size') == stat.st_size and prev.get('mtime') == stat.st_mtime_ns:
+            kept[path] = prev
+        else:
+            jobs.append((chain_denoms, years, config_hash, path, prev))
+    changed = len(checkpoints.keys() - set(paths)) != 0
+
+    timing.count('trackers.skipped', len(kept))
+    timing.count('trackers.scanned', len(jobs))
+    if not jobs and not changed:
+        # nothing to parse (unchanged files, 304 Not Modified), the last ledger as it was written
+        old = previous()
+        if old is not None and 'Contributor' in old and len(old) >= sum(cp['parser']['rows'] for cp in kept.values()):
+            return old, dict(kept), False
+    local = [job for job in jobs if job[3] not in responses]
+    if len(local) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(local), workers or os.cpu_count() or 1)) as pool:
+            done = dict(zip([job[3] for job in local], pool.map(scan_tracker, local)))
+    else:
+        done = {job[3]: scan_tracker(job) for job in local}
+    for job in jobs:
+        if job[3] in responses:
+            done[job[3]] = scan_tracker(job, responses[job[3]])
+    scanned = [done[job[3]] for job in jobs]
+    timing.count('rows.parsed', sum(len(rows) for _, _, rows, _ in scanned))
+
+    old = previous() if kept or any(mode != 'full' for mode, _, _, _ in scanned) else None
+    old_rows = dict()
+    if old is not None and 'Contributor' in old:
+        for name, rows in old.groupby('Contributor', observed=True, sort=False):
+            old_rows[name] = rows.drop(columns='Contributor').reset_index(drop=True)
+
+    frames = list()
+    new_checkpoints = dict()
+    for path, prev in kept.items():
+        rows = old_rows.get(names[path])
+        if rows is not None and len(rows) >= prev['parser']['rows']:
+            frames.append((path, rows))
+            new_checkpoints[path] = prev
+        else:
+            jobs.append((chain_denoms, years, config_hash, path, None))
+            scanned.append(scan_tracker(jobs[-1]))
+    for (mode, base, rows, cp), job in zip(scanned, jobs):
+        path = job[3]
+        merger = incremental_parser(chain_denoms, years, config_hash)
+        merger.mode, merger.base = mode, base
+        ledger = merger.merge(rows, old_rows.get(names[path]))
+        if ledger is None:
+            mode, base, ledger, cp = scan_tracker((chain_denoms, years, config_hash, path, None))
+        changed = changed or mode != 'unchanged'
+        frames.append((path, ledger))
+        new_checkpoints[path] = cp
+
+    for path, rows in frames:
+        rows['Contributor'] = names[path]
+    ledger = concat([rows for _, rows in sorted(frames, key=lambda f: f[0])]) if frames else ledger_frame([])
+    return ledger, new_checkpoints, changed
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from .tracker import ROW
+from .table import table_index
+
+# statuses that count as income, as the dashboard always did: only ✅ rows
+INCOME = ['paid']
+CATEGORIES = ['Contributor', 'Year', 'Blockchain', 'Status', 'Month', 'Tokens']
+
+def ledger_frame(rows):
+    """
+        Parser rows as a typed frame: categoricals for the repeated labels, the day/month of the
+        Date column combined with the section year into datetime64, Amount as float64
+    """
+    df = pd.DataFrame(list(rows), columns=list(ROW))
+    parts = df['Date'].astype(str).str.extract(r"(\d{1,2})\s*/\s*(\d{1,2})(?:\s*/\s*(\d{2,4}))?")
+    year = pd.to_numeric(parts[2], errors='coerce')
+    year = year.where(year.isna() | (year >= 100), year + 2000).fillna(pd.to_numeric(df['Year'], errors='coerce'))
+    df['Date'] = pd.to_datetime(pd.DataFrame({
+        'year': year,
+        'month': pd.to_numeric(parts[1], errors='coerce'),
+        'day': pd.to_numeric(parts[0], errors='coerce'),
+    }), errors='coerce')
+    return typed(df)
+
+def typed(df):
+    df = df.copy()
+    for col in CATEGORIES:
+        if col in df:
+            df[col] = df[col].astype('category')
+    df['Amount'] = df['Amount'].astype('float64')
+    return df.reset_index(drop=True)
+
+def concat(frames):
+    # categoricals with different categories come out of pd.concat as object, re-type them
+    return typed(pd.concat(frames, ignore_index=True))
+
+class payout_ledger():
+    """
+        Row-level bounty history, one row per bounty and token, indexed on status, chain, token
+        (category codes) and date (sort order), see table_index
+    """
+    def __init__(self, df):
+        self.df = df
+        self.index = table_index(df, filters=('Status', 'Blockchain', 'Tokens', 'Year', 'Contributor'), sorts=('Date', 'Amount'))
+
+    def rows(self, **filters):
+        return self.index.select(**filters)
+
+    def between(self, start, end, rows=None):
+        """
+            Row positions dated in [start, end], optionally within `rows`
+        """
+        order = self.index.order['Date']
+        dates = self.df['Date'].to_numpy()[order]
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        found = order[lo:hi]
+        return found if rows is None else np.intersect1d(found, rows)
+
+    def income(self):
+        return self.df.iloc[self.rows(Status=INCOME)]
+
+    def pending(self):
+        return self.df.iloc[self.rows(Status=['unpaid'])]
+
+    def totals(self, values=None, by=('Contributor', 'Year', 'Blockchain', 'Tokens')):
+        """
+            {(contributor, year, chain, token): sum} of Amount, or of `values` (aligned to the frame),
+            over the income rows
+        """
+        income = self.income()
+        values = income['Amount'] if values is None else values.loc[income.index]
+        sums = values.groupby([income[col] for col in by], observed=True).sum()
+        return sums.to_dict()
+
+    def count_by_month(self):
+        # bounties (not token rows) per month of Date
+        bounties = self.df.drop_duplicates(['Contributor', 'Year', 'Blockchain', 'Bounty', 'Link', 'Date'])
+        return bounties.groupby(bounties['Date'].dt.to_period('M'))['Bounty'].count()
@@ -0,0 +1,150 @@
+import os, threading
+from contextlib import contextmanager
+from . import snapshot
+from .refresh import background_refresh
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILE = "data/ingest.lock"
+KEEP = 2 # snapshot versions kept in memory, sessions still drawing the previous one share it too
+
+@contextmanager
+def file_lock(path):
+    """
+        Exclusive lock on `path` across processes, blocks until it is free
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+b') as fp:
+        if fcntl is not None:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+        else:
+            fp.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass # LK_LOCK gives up after 10s, keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+            else:
+                fp.seek(0)
+                msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+class snapshot_manager():
+    """
+        Process wide owner of the published snapshot, see `shared()`.
+        Refreshes are single flight: a session asking while an ingest runs in this process waits
+        for that one, and ingests of other processes (the ingest worker, other replicas) are
+        serialized with a lock file, an ingest that waited for another one that published is
+        skipped. Every version is read once and the frame, and whatever is built from it
+        (cube, chart options, table index), is shared read-only by all sessions
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, lock_file=LOCK_FILE):
+        self.lock_file = lock_file
+        self.lock = threading.Lock() # held for lookups only, never while building
+        self.cache = dict() # version -> {name: value}
+        self.building = dict() # (version, name) -> lock of the one build in flight
+        self.refresher = background_refresh('payout')
+        self.stamp_lock = threading.Lock()
+        self.stamp = None # of the inputs when the last ingest was started
+        self.pending = None # (job, stamp) asked for while one was in flight, run right after it
+        self.active = False # an ingest of `refresh` is in flight
+
+    def exclusive(self, job):
+        """
+            Run `job()` holding the ingest lock, None without running it when another process
+            published a new version while this one waited for the lock
+        """
+        seen = snapshot.version()
+        with file_lock(self.lock_file):
+            if snapshot.version() != seen:
+                return None
+            return job()
+
+    def refresh(self, job, wait=False, stamp=None):
+        """
+            Start the ingest `job()` in the background unless one is in flight already, and wait
+            for it with `wait`. With a `stamp` of its inputs (see calculator.ingest_stamp) none
+            is started when it is the stamp of the last one, a running one is still waited for.
+            A new stamp while one is in flight runs once more right after it, in the same
+            background run (its waiters get the newer data), and a failed ingest forgets its
+            stamp so the next call tries again. Returns the background_refresh tracking it
+        """
+        with self.stamp_lock:
+            if self.active:
+                if stamp is not None and stamp != self.stamp:
+                    self.pending = (job, stamp)
+            elif stamp is None or stamp != self.stamp:
+                self.refresher.wait() # the last run may still be winding down
+                self.active = True
+                self.stamp = stamp
+                self.refresher.start(lambda: self.run(job))
+        if wait:
+            self.refresher.wait()
+        return self.refresher
+
+    def run(self, job):
+        # the ingest of `refresh`, then the one asked for while it ran
+        try:
+            while True:
+                self.exclusive(job)
+                with self.stamp_lock:
+                    if self.pending is None:
+                        self.active = False
+                        return
+                    job, self.stamp = self.pending
+                    self.pending = None
+        except BaseException:
+            with self.stamp_lock:
+                self.stamp, self.pending, self.active = None, None, False
+            raise
+
+    def get(self, version, name, build):
+        """
+            build() once per snapshot version and `name`, shared by every caller. Callers of the
+            same key wait for the build in flight, other keys are served meanwhile (builders may
+            get() what they are built from). Treat the result as read-only
+        """
+        key = (version, name)
+        with self.lock:
+            found = self.cache.get(version, dict())
+            if name in found:
+                return found[name]
+            building = self.building.setdefault(key, threading.Lock())
+        with building:
+            with self.lock:
+                found = self.cache.get(version, dict())
+                if name in found:
+                    return found[name]
+            try:
+                value = build()
+            except BaseException:
+                with self.lock:
+                    self.building.pop(key, None)
+                raise
+            with self.lock:
+                self.cache.setdefault(version, dict())[name] = value
+                self.building.pop(key, None)
+                for old in sorted(self.cache)[:-KEEP]:
+                    del self.cache[old]
+            return value
+
+    def frame(self, version):
+        return self.get(version, 'frame', lambda: snapshot.read(snapshot.snapshot_file(version)))
@@ -0,0 +1,85 @@
+import requests
+from .fetch import fetch_scheduler
+
+COINGECKO_URL = "https://api.coingecko.com/api/v3"
+MAX_PER_PAGE = 250  # /coins/markets page size limit
+
+_session = None
+
+def get_session():
+    """
+        One pooled HTTP session per process, reused across Streamlit reruns
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+class price_service():
+    """
+        Fetch the current price of every token in the `API` section of setting.yaml,
+        deduplicated by CoinGecko id, in one batched /coins/markets request.
+        Requests go through a fetch_scheduler (rate limit, retries, fallback providers),
+        by default one for `url` alone with the default limits
+    """
+    def __init__(self, api, url=COINGECKO_URL, currency='usd', session=None, scheduler=None):
+        self.api = api # token -> coingecko id
+        self.url = url.rstrip('/')
+        self.currency = currency
+        self.session = session or get_session()
+        self.scheduler = scheduler or fetch_scheduler([self.url], self.session)
+
+    def ids(self):
+        return sorted({str(v).lower() for v in self.api.values()})
+
+    def fetch_ids(self, ids):
+        # {coingecko id: price}, ids that failed, are missing from the response or have no price are left out
+        prices = dict()
+        for n in range(0, len(ids), MAX_PER_PAGE):
+            chunk = ids[n:n + MAX_PER_PAGE]
+            coins = self.scheduler.get("/coins/markets", params={
+                'vs_currency': self.currency,
+                'ids': ','.join(chunk),
+                'per_page': MAX_PER_PAGE,
+            })
+            for coin in coins or []:
+                # a null price keeps the last known one of the cache
+                if coin.get('current_price') is not None:
+                    prices[coin['id']] = coin['current_price']
+        return prices
+
+    def fetch_matrix(self, ids, currencies):
+        """
+            {currency: {coingecko id: price}} of every id in every currency, one /simple/price
+            request per chunk of ids. Ids that failed or are missing are left out
+        """
+        matrix = {currency: dict() for currency in currencies}
+        for n in range(0, len(ids), MAX_PER_PAGE):
+            chunk = ids[n:n + MAX_PER_PAGE]
+            found = self.scheduler.get("/simple/price", params={
+                'ids': ','.join(chunk),
+                'vs_currencies': ','.join(currencies),
+            })
+            for cid, prices in (found or {}).items():
+                for currency in currencies:
+                    if prices.get(currency) is not None:
+                        matrix[currency][cid] = prices[currency]
+        return matrix
+
+    def fetch(self):
+        """
+            Return {token: price}, 0 when CoinGecko has no price for the token
+        """
+        by_id = self.fetch_ids(self.ids())
+        return {token: by_id.get(str(cid).lower(), 0) for token, cid in self.api.items()}
+
+    def fetch_range(self, cid, start, end):
+        """
+            [[unix ms, price], ...] of `cid` between two unix times, None when the request fails
+        """
+        found = self.scheduler.get(f"/coins/{cid}/market_chart/range", params={
+            'vs_currency': self.currency,
+            'from': int(start),
+            'to': int(end),
+        })
+        return None if found is None else found.get('prices', [])
@@ -0,0 +1,131 @@
+import json, os, threading, time
+from . import timing
+
+CACHE_FILE = "data/price_cache.json"
+CACHE_TTL = 600 # seconds
+
+class price_cache():
+    """
+        Disk-backed TTL cache in front of price_service.
+        Fresh entries are served from disk, stale entries are served at once while a
+        background thread refreshes them (with `background` false they are fetched before
+        `get()` returns, for a process that exits when it is done), and the last known price
+        is kept when CoinGecko can't be reached. `info` holds the fetch time, age and source of every price after `get()`.
+        With more `currencies` than the service currency every fetch asks for all of them at
+        once, so the whole tokens x currencies matrix is refreshed and cached together
+    """
+    _lock = threading.Lock() # guards the cache file and the in-flight set, process wide
+    _inflight = set()
+
+    def __init__(self, service, path=CACHE_FILE, ttl=CACHE_TTL, currencies=(), background=True):
+        self.service = service
+        self.path = path
+        self.ttl = ttl
+        self.background = background
+        self.currencies = [service.currency] + [c for c in currencies if c != service.currency]
+        self.info = dict()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return dict()
+
+    def store(self, fetched, now):
+        # {currency: {id: price}}, merged into what is on disk now, a concurrent refresh may have written in between
+        with self._lock:
+            data = self.load()
+            for currency, prices in fetched.items():
+                entries = data.setdefault(currency, dict())
+                for cid, price in prices.items():
+                    entries[cid] = {'price': price, 'time': now}
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                json.dump(data, fp, indent=2)
+            os.replace(tmp, self.path)
+        return data
+
+    def update(self, ids, now=None):
+        # ids CoinGecko did not answer for keep their last known entry, returns the service currency prices
+        now = now or time.time()
+        if len(self.currencies) == 1:
+            fetched = {self.service.currency: self.service.fetch_ids(ids)}
+        else:
+            fetched = self.service.fetch_matrix(ids, self.currencies)
+        if any(len(prices) != 0 for prices in fetched.values()):
+            self.store(fetched, now)
+        return fetched[self.service.currency]
+
+    def refresh(self, ids):
+        keys = {(self.path, self.service.currency, cid) for cid in ids}
+        with self._lock:
+            ids = [k[2] for k in keys - self._inflight]
+            self._inflight.update((self.path, self.service.currency, cid) for cid in ids)
+        if len(ids) == 0:
+            return
+
+        def run():
+            try:
+                self.update(ids)
+            finally:
+                with self._lock:
+                    self._inflight.difference_update((self.path, self.service.currency, cid) for cid in ids)
+        threading.Thread(target=run, name="price-refresh", daemon=True).start()
+
+    def get(self):
+        """
+            Return {token: price}, 0 only for tokens that were never priced
+        """
+        now = time.time()
+        data = self.load()
+        entries = data.get(self.service.currency, dict())
+        ids = self.service.ids()
+        source = dict()
+        for cid in ids:
+            # a currency added to setting.yaml is fetched right away, with the others
+            if cid not in entries or any(cid not in data.get(c, {}) for c in self.currencies[1:]):
+                source[cid] = 'unavailable'
+            elif now - entries[cid]['time'] < self.ttl:
+                source[cid] = 'cache'
+            else:
+                source[cid] = 'stale'
+
+        due = [cid for cid in ids if source[cid] == 'unavailable' or (source[cid] == 'stale' and not self.background)]
+        if len(due) != 0:
+            fetched = self.update(due, now)
+            for cid, price in fetched.items():
+                entries[cid] = {'price': price, 'time': now}
+                source[cid] = 'network'
+        # what could not be fetched keeps its last known price
+        stale = [cid for cid in ids if source[cid] == 'stale']
+        if len(stale) != 0 and self.background:
+            self.refresh(stale)
+
+        for cid in ids:
+            timing.count(f"price.{source[cid]}")
+        prices = dict()
+        self.info = dict()
+        for token, cid in self.service.api.items():
+            cid = str(cid).lower()
+            entry = entries.get(cid)
+            prices[token] = entry['price'] if entry else 0
+            self.info[token] = {
+                'id': cid,
+                'price': prices[token],
+                'age': now - entry['time'] if entry else None,
+                'time': entry['time'] if entry else None,
+                'source': source[cid],
+            }
+        return prices
+
+    def matrix(self):
+        """
+            {currency: {token: price}} of the cached prices, None where a price was never fetched
+        """
+        data = self.load()
+        return {
+            currency: {token: (data.get(currency, {}).get(str(cid).lower()) or {}).get('price') for token, cid in self.service.api.items()}
+            for currency in self.currencies
+        }
@@ -0,0 +1,53 @@
+import threading
+
+class background_refresh():
+    """
+        Runs a job in a daemon thread, at most one per name and process: a session that asks
+        while one is running shares it instead of starting another. It lives in this module,
+        not in app.py, because streamlit re-executes the app script on every rerun
+    """
+    _lock = threading.Lock()
+    _threads = dict()
+    _errors = dict()
+
+    def __init__(self, name):
+        self.name = name
+
+    def start(self, job):
+        """
+            Start `job()` unless it is already running, return the running thread
+        """
+        with self._lock:
+            thread = self._threads.get(self.name)
+            if thread is not None and thread.is_alive():
+                return thread
+
+            def run():
+                try:
+                    job()
+                    self._errors.pop(self.name, None)
+                except Exception as exc:
+                    self._errors[self.name] = exc
+            thread = threading.Thread(target=run, name=f"refresh-{self.name}", daemon=True)
+            # started before it is published, `wait` of another session may join it right away
+            thread.start()
+            self._threads[self.name] = thread
+            return thread
+
+    def running(self):
+        thread = self._threads.get(self.name)
+        return thread is not None and thread.is_alive()
+
+    def wait(self, timeout=None):
+        """
+            Wait for the running job, True when none is left running
+        """
+        thread = self._threads.get(self.name)
+        if thread is not None:
+            thread.join(timeout)
+        return not self.running()
+
+    @property
+    def error(self):
+        # exception of the last run, None when it went fine
+        return self._errors.get(self.name)
@@ -0,0 +1,52 @@
+"""
+    Trackers served over HTTP(S), e.g. the raw README.md of a Git hosting repo. The ETag and
+    Last-Modified of the last download are kept in the tracker checkpoint and sent back as
+    If-None-Match/If-Modified-Since, an unchanged tracker costs one 304 and nothing else
+"""
+from .price import get_session
+from . import timing
+
+TIMEOUT = 30 # seconds, connect and between two chunks of the body
+CHUNK = 64 * 1024
+
+def is_url(path):
+    return str(path).startswith(('http://', 'https://'))
+
+def validators(response):
+    # what to send back next time, only what the server gave
+    return {'etag': response.headers.get('ETag'), 'last-modified': response.headers.get('Last-Modified')}
+
+def fetch(url, prev=None, session=None):
+    """
+        Streaming GET of `url`, conditional on the validators of checkpoint `prev`.
+        None when the server answers 304 Not Modified, else the open response, its body
+        not read yet (see lines). Raises requests.HTTPError on an error status
+    """
+    headers = dict()
+    if prev:
+        if prev.get('etag'):
+            headers['If-None-Match'] = prev['etag']
+        if prev.get('last-modified'):
+            headers['If-Modified-Since'] = prev['last-modified']
+    response = (session or get_session()).get(url, headers=headers, stream=True, timeout=TIMEOUT)
+    timing.count('tracker.requests')
+    timing.count(f"tracker.{response.status_code}")
+    if response.status_code == 304:
+        response.close()
+        return None
+    response.raise_for_status()
+    return response
+
+def lines(response):
+    """
+        Raw lines of the body as they arrive, with their b'\n', the last one without it when
+        the body doesn't end in a newline
+    """
+    rest = b''
+    for chunk in response.iter_content(CHUNK):
+        parts = (rest + chunk).split(b'\n')
+        rest = parts.pop()
+        for part in parts:
+            yield part + b'\n'
+    if rest:
+        yield rest
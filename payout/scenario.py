@@ -0,0 +1,93 @@
+"""
+    Price what-if: the token amounts of the payout frame valued under a matrix of price scenarios,
+    one row of prices (one per token) per scenario. Every outcome is a matrix product of the
+    amounts and the scenario matrix, thousands of scenarios cost a few milliseconds
+"""
+import numpy as np
+import pandas as pd
+from .cube import payout_cube
+
+SCENARIOS = 2000 # random scenarios by default
+PCT = 30 # default +/- percent
+SEED = 0
+
+class price_scenarios():
+    """
+        `prices` is scenarios x tokens, its columns in the order of `cube.tokens`, the cube
+        holding token amounts (payout_cube(df, value='Amount')). `names` labels the scenarios
+    """
+    def __init__(self, cube, prices, names=None):
+        self.cube = cube
+        self.prices = np.asarray(prices, dtype='float64').reshape(-1, len(cube.tokens))
+        self.names = names
+
+    def totals(self):
+        # income of every scenario
+        return self.prices @ self.cube.values.sum(axis=(0, 1))
+
+    def by_year(self):
+        # years x scenarios
+        return pd.DataFrame(self.cube.values.sum(axis=1) @ self.prices.T, index=self.cube.years)
+
+    def by_chain(self):
+        # chains x scenarios
+        return pd.DataFrame(self.cube.values.sum(axis=0) @ self.prices.T, index=self.cube.chains)
+
+    def cells(self):
+        # scenarios x years x chains x tokens, amount times price in one broadcast
+        return self.cube.values[None] * self.prices[:, None, None, :]
+
+    def percentiles(self, outcomes, q=(5, 50, 95)):
+        """
+            Percentiles over the scenarios of `outcomes` (a rows x scenarios frame, or the totals)
+        """
+        if isinstance(outcomes, pd.DataFrame):
+            return pd.DataFrame(np.percentile(outcomes.to_numpy(), q, axis=1).T, index=outcomes.index, columns=[f"p{p}" for p in q])
+        return dict(zip([f"p{p}" for p in q], np.percentile(outcomes, q).tolist()))
+
+def amounts(df):
+    # Year x Blockchain x Tokens amounts of the payout frame
+    return payout_cube(df, value='Amount')
+
+def base_prices(tokens, prices, df=None):
+    """
+        Price per token, `prices` ({token: price}) first, else the average Price the frame paid
+    """
+    paid = dict()
+    if df is not None:
+        rows = df[df['Amount'] > 0]
+        paid = (rows.groupby('Tokens', observed=True)['Amount_USD'].sum() / rows.groupby('Tokens', observed=True)['Amount'].sum()).to_dict()
+    return np.array([(prices or {}).get(t) or paid.get(t) or 0.0 for t in tokens])
+
+def shocks(base, pct=PCT, n=SCENARIOS, seed=SEED):
+    # `n` scenarios, every token moving on its own, uniformly within +/- pct percent
+    rng = np.random.default_rng(seed)
+    return base * (1 + rng.uniform(-pct / 100, pct / 100, size=(n, len(base))))
+
+def sweep(base, pct=PCT, steps=41):
+    # every token moving together from -pct to +pct percent, in `steps` scenarios
+    return np.linspace(1 - pct / 100, 1 + pct / 100, steps)[:, None] * base
+
+def historical(series, tokens, base):
+    """
+        One scenario per day of the daily price `series` ({token: pd.Series}), all tokens at
+        the price of that day, so every token's high and low is among them. Tokens without
+        series (or days before their first price) keep `base`
+    """
+    known = {t: s for t, s in series.items() if len(s) != 0}
+    if not known:
+        return np.empty((0, len(tokens)))
+    table = pd.DataFrame(known).sort_index().ffill()
+    prices = np.tile(base, (len(table), 1))
+    for n, token in enumerate(tokens):
+        if token in table:
+            prices[:, n] = table[token].fillna(base[n]).to_numpy()
+    return prices
+
+def grid(table, tokens, base):
+    """
+        User scenarios, `table` having one row per scenario and one column per token (a price),
+        empty cells and missing tokens keep `base`
+    """
+    table = table.reindex(columns=tokens)
+    return np.where(table.isna().to_numpy(), base, table.to_numpy(dtype='float64'))
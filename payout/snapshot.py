@@ -0,0 +1,116 @@
+import glob, json, os, shutil, threading, time
+import pyarrow.feather as feather
+
+SNAPSHOT_DIR = "data/snapshots" # payout-<version>.arrow, ledger-<version>.arrow and current.json pointing at the newest
+MANIFEST_FILE = "data/snapshots/current.json"
+KEEP = 3 # published versions kept on disk, readers may still have an older one mapped
+LEDGER_FILE = "data/ledger.arrow"
+CATEGORIES = ['Contributor', 'Year', 'Blockchain', 'Tokens']
+NUMBERS = ['Amount', 'Price', 'Amount_USD']
+
+def typed(df):
+    """
+        Contributor/Year/Blockchain/Tokens as categoricals and the money columns as float64
+    """
+    df = df.copy()
+    for col in CATEGORIES:
+        if col in df:
+            df[col] = df[col].astype('category')
+    for col in NUMBERS:
+        if col in df:
+            df[col] = df[col].astype('float64')
+    return df
+
+def write(df, path):
+    """
+        Write `df` as an uncompressed Arrow IPC (Feather v2) file so it can be memory mapped.
+        The file is written next to `path` and renamed over it, readers never see half a snapshot
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    feather.write_feather(typed(df), tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+def write_json(data, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp)
+    os.replace(tmp, path)
+
+def snapshot_file(version):
+    return os.path.join(SNAPSHOT_DIR, f"payout-{version:06d}.arrow")
+
+def ledger_file(version):
+    return os.path.join(SNAPSHOT_DIR, f"ledger-{version:06d}.arrow")
+
+def link(src, dst):
+    # `dst` as a hard link to `src` (written files are replaced, never changed in place), a copy where links aren't possible
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+def manifest():
+    """
+        {version, file, published, ...} of the newest published snapshot, None before the first
+    """
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+def publish(df, ledger=None, **meta):
+    """
+        Write `df` as the next numbered snapshot, then point current.json at it. Readers keep
+        the version they opened until they read the manifest again, the oldest files beyond
+        KEEP are removed. `ledger`, the ledger file `df` was computed from, is published with
+        it (the manifest's 'ledger'). `meta` (e.g. priced_at) is kept in the manifest
+    """
+    current = manifest() or {}
+    n = current.get('version', 0) + 1
+    path = snapshot_file(n)
+    write(df, path)
+    if ledger is not None:
+        meta['ledger'] = ledger_file(n)
+        link(ledger, meta['ledger'])
+    write_json({'version': n, 'file': path, 'published': time.time(), **meta}, MANIFEST_FILE)
+    for pattern in ('payout-*.arrow', 'ledger-*.arrow'):
+        for old in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, pattern)))[:-KEEP]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass # still mapped by a reader on Windows, removed next time
+    return n
+
+def annotate(**meta):
+    # update the manifest of the current version without publishing a new one
+    current = manifest()
+    if current is not None:
+        write_json({**current, **meta}, MANIFEST_FILE)
+
+def version(path=None):
+    """
+        Version of the published snapshot, or of the file at `path` (changes whenever it is
+        replaced), None when there is none yet
+    """
+    if path is None:
+        current = manifest()
+        return current['version'] if current else None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_ino}-{stat.st_mtime_ns}-{stat.st_size}"
+
+def read(path):
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def read_if_exists(path):
+    try:
+        return read(path)
+    except OSError:
+        return None
@@ -0,0 +1,49 @@
+import numpy as np
+
+class table_index():
+    """
+        Filtering, sorting and paging of the payout frame for the income table.
+        Category codes of the filter columns and the sort order of the sort columns are
+        computed once, so a filter is a lookup into a boolean array per column instead of a
+        parsed df.query string, and only the requested page is ever copied out of the frame
+    """
+    def __init__(self, df, filters=('Year', 'Blockchain'), sorts=('Amount', 'Price', 'Amount_USD')):
+        self.df = df.reset_index(drop=True)
+        self.categories = dict()
+        self.codes = dict()
+        for col in filters:
+            cat = self.df[col].astype('category').cat
+            self.categories[col] = cat.categories.tolist()
+            self.codes[col] = cat.codes.to_numpy()
+        self.order = {col: np.argsort(self.df[col].to_numpy(), kind='stable') for col in sorts}
+
+    def options(self, col):
+        return self.categories[col]
+
+    def select(self, sort_by=None, ascending=True, **filters):
+        """
+            Row positions matching every filter ({column: [values]}), optionally sorted
+        """
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, values in filters.items():
+            wanted = np.zeros(len(self.categories[col]) + 1, dtype=bool) # last slot catches code -1 (NaN)
+            lookup = {v: n for n, v in enumerate(self.categories[col])}
+            for value in values:
+                if value in lookup:
+                    wanted[lookup[value]] = True
+            mask &= wanted[self.codes[col]]
+        if sort_by is None:
+            return np.flatnonzero(mask)
+        order = self.order[sort_by]
+        rows = order[mask[order]]
+        return rows if ascending else rows[::-1]
+
+    def page_count(self, rows, page_size):
+        return max(1, -(-len(rows) // page_size))
+
+    def page(self, rows, page, page_size):
+        """
+            The frame slice of page `page` (0 based)
+        """
+        page = min(max(page, 0), self.page_count(rows, page_size) - 1)
+        return self.df.iloc[rows[page * page_size:(page + 1) * page_size]]
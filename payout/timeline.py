@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from .ledger import payout_ledger
+
+KEYS = ['Contributor', 'Year', 'Blockchain', 'Tokens']
+DAY = np.timedelta64(1, 'D')
+MONDAY = np.datetime64('1970-01-05') # weeks start on Monday
+
+class payout_timeline():
+    """
+        Income over time of the ledger's dated income rows, valued at the Price of their
+        Contributor/Year/Blockchain/Tokens row in the payout frame (so every period adds up to
+        the frame and follows its currency). Kept as running totals per day and per chain and
+        token: `sums[name][d]` is the income before day `d`, the total of any date range is the
+        difference of two rows and a month/week series is one lookup per period boundary
+    """
+    def __init__(self, ledger_df, df, currency='USD'):
+        self.currency = currency
+        income = payout_ledger(ledger_df).income()
+        income = income[income['Date'].notna() & income['Tokens'].notna()]
+        price = df.set_index(KEYS)['Price']
+        values = income['Amount'].to_numpy() * price.reindex(pd.MultiIndex.from_frame(income[KEYS].astype(object))).fillna(0).to_numpy()
+        days = income['Date'].to_numpy().astype('datetime64[D]')
+        self.first = days.min() if len(days) else np.datetime64('today', 'D')
+        self.last = days.max() if len(days) else self.first
+        day = (days - self.first).astype(np.int64)
+        n_days = int((self.last - self.first) / DAY) + 1
+
+        self.labels, self.sums = dict(), dict()
+        for name, col in (('chains', 'Blockchain'), ('tokens', 'Tokens')):
+            cat = income[col].astype(str).astype('category').cat
+            daily = np.zeros((n_days, len(cat.categories)))
+            np.add.at(daily, (day, cat.codes.to_numpy()), values)
+            self.labels[name] = cat.categories.tolist()
+            self.sums[name] = np.concatenate([np.zeros((1, daily.shape[1])), daily.cumsum(axis=0)])
+
+    def before(self, date):
+        # row of `sums` holding the income dated before `date`, clipped to the covered days
+        offset = int((np.datetime64(pd.Timestamp(date), 'D') - self.first) / DAY)
+        return min(max(offset, 0), len(self.sums['chains']) - 1)
+
+    def between(self, start, end, by='chains'):
+        """
+            Income per chain (or token) dated in [start, end], two lookups
+        """
+        sums = self.sums[by]
+        return pd.Series(sums[self.before(pd.Timestamp(end) + pd.Timedelta(days=1))] - sums[self.before(start)], index=self.labels[by])
+
+    def total(self, start, end):
+        return float(self.between(start, end).sum())
+
+    def boundaries(self, start, end, freq):
+        # [start, first day of every following month/week (Mondays), ..., end + 1 day] and the period labels
+        start, end = np.datetime64(pd.Timestamp(start), 'D'), np.datetime64(pd.Timestamp(end), 'D')
+        if freq == 'Month':
+            firsts = np.arange(start.astype('datetime64[M]'), end.astype('datetime64[M]') + 1).astype('datetime64[D]')
+            labels = firsts.astype('datetime64[M]').astype(str)
+        else:
+            monday = start - (start - MONDAY) % (7 * DAY)
+            firsts = np.arange(monday, end + 1, 7 * DAY)
+            labels = firsts.astype(str)
+        return np.concatenate([[start], firsts[1:], [end + 1]]), labels.tolist()
+
+    def series(self, start, end, freq='Month', by='chains', cumulative=False):
+        """
+            periods x chains (or tokens) income between `start` and `end`, per month or week,
+            or running totals from `start` with `cumulative`
+        """
+        edges, labels = self.boundaries(start, end, freq)
+        rows = np.clip((edges - self.first) // DAY, 0, len(self.sums[by]) - 1)
+        at = self.sums[by][rows]
+        values = at[1:] - at[0] if cumulative else np.diff(at, axis=0)
+        return pd.DataFrame(values, index=labels, columns=self.labels[by])
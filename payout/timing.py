@@ -0,0 +1,105 @@
+import json, os, threading, time
+from contextlib import contextmanager
+
+LOG_FILE = "data/timing.jsonl"
+
+_local = threading.local()
+_log_lock = threading.Lock()
+last = dict() # run name -> its latest finished recorder in this process
+
+class recorder():
+    """
+        Spans (total seconds and calls per name) and counters of one run, e.g. one ingest or one
+        rerun of the page. `span`/`count` record into the recorder of the current thread and do
+        nothing when there is none
+    """
+    def __init__(self, name, log_file=None):
+        self.name = name
+        self.log_file = log_file # one JSON line per run is appended here when set
+        self.started = time.time()
+        self.elapsed = None
+        self.spans = dict()
+        self.counts = dict()
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self.lock:
+            found = self.spans.setdefault(name, [0.0, 0])
+            found[0] += seconds
+            found[1] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def record(self):
+        # JSON friendly summary, durations in ms
+        with self.lock:
+            return {
+                'run': self.name,
+                'time': self.started,
+                'ms': None if self.elapsed is None else round(self.elapsed * 1000, 3),
+                'spans': {name: {'ms': round(s * 1000, 3), 'n': n} for name, (s, n) in self.spans.items()},
+                'counts': dict(self.counts),
+            }
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+@contextmanager
+def recording(name, log_file=None):
+    """
+        Record the spans and counters of the current thread into a new recorder, kept in
+        `last[name]` and logged to its log_file when the block ends (also on exceptions)
+    """
+    rec = recorder(name, log_file)
+    outer = current()
+    _local.recorder = rec
+    start = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec.elapsed = time.perf_counter() - start
+        _local.recorder = outer
+        last[name] = rec
+        if rec.log_file:
+            log(rec.record(), rec.log_file)
+
+@contextmanager
+def span(name):
+    rec = current()
+    if rec is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec.add(name, time.perf_counter() - start)
+
+def count(name, n=1):
+    rec = current()
+    if rec is not None:
+        rec.count(name, n)
+
+def bind(fn):
+    """
+        `fn` recording into the current thread's recorder from whatever thread runs it
+    """
+    rec = current()
+
+    def run(*args, **kwargs):
+        outer = current()
+        _local.recorder = rec
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.recorder = outer
+    return run
+
+def log(record, path=LOG_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    line = json.dumps(record) + '\n'
+    with _log_lock:
+        with open(path, 'a', encoding='utf-8') as fp:
+            fp.write(line)
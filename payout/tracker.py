@@ -0,0 +1,111 @@
+import re
+
+# Check column markers of the tracker table
+STATUS = {
+    "✅": "paid",
+    "❌": "unpaid",
+    "💀": "rip",
+    "👑": "grand-prize",
+}
+# one ledger row: the bounty, and one of the amounts it pays
+ROW = ('Year', 'Blockchain', 'Status', 'Bounty', 'Link', 'Month', 'Date', 'Tokens', 'Amount')
+
+class tracker_parser():
+    """
+        Single pass README.md parser. Every pattern is compiled once from setting.yaml and
+        each line is classified as a year header (## 2022, ## 2022: Season 2), a chain header
+        (### ... CHAIN Bounties) or a table row. Every bounty row becomes one `ROW` tuple per
+        token in its Rewards cell, whatever its status, the amounts come out of one combined pattern.
+        The current year/chain survive between `parse` calls so a tracker can be fed in pieces
+    """
+    def __init__(self, chain_denoms, years):
+        self.chain_denoms = {chain: list(denoms) for chain, denoms in chain_denoms.items()}
+        self.years = {str(y): y for y in years}
+        self.curr_year = None
+        self.curr_chain = None
+        self.rows = list()
+
+        # longest first so NEAR-CHAIN wins over NEAR
+        chains = sorted(self.chain_denoms, key=len, reverse=True)
+        denoms = sorted({d for ds in self.chain_denoms.values() for d in ds}, key=len, reverse=True)
+        self.year_re = re.compile(r"## +(\d{4})\b")
+        self.chain_re = re.compile(r".+?(%s) Bounties" % "|".join(map(re.escape, chains)))
+        self.status_re = re.compile(r"\|.(%s)" % "|".join(STATUS))
+        self.bounty_re = re.compile(r"\s*\[(.*)\]\((.*)\)")
+        # the whole | Check | [Bounty](link) | Month | Date | Rewards | row in one match
+        self.row_re = re.compile(
+            r"\|.(%s)[^|]*\|\s*(?:\[([^|]*)\]\(([^|]*)\)|([^|]*?))\s*\|\s*([^|]*?)\s*\|\s*([^|]*?)\s*\|([^|]*)" % "|".join(STATUS)
+        )
+        self.amount_re = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(%s)(?![\w-])" % "|".join(map(re.escape, denoms)))
+
+    def checkpoint(self):
+        """
+            JSON friendly copy of the parser state, see `restore`
+        """
+        return {'year': self.curr_year, 'chain': self.curr_chain, 'rows': len(self.rows)}
+
+    def restore(self, state):
+        # the rows themselves are kept by the caller
+        self.curr_year = state['year']
+        self.curr_chain = state['chain']
+
+    def rewards(self, cell):
+        # first amount of every denom of the current chain, in order of appearance
+        denoms = self.chain_denoms[self.curr_chain]
+        found = dict()
+        for m in self.amount_re.finditer(cell):
+            denom = m.group(2)
+            if denom in denoms and denom not in found:
+                found[denom] = float(m.group(1).replace(',', ''))
+        return found
+
+    def row(self, line, status):
+        # rows with missing cells, the common case goes through row_re in `parse`
+        cells = line.strip().strip('|').split('|')
+        cells += [''] * (5 - len(cells))
+        m = self.bounty_re.match(cells[1])
+        bounty, link = (m.group(1), m.group(2)) if m else (cells[1].strip(), None)
+        return self.ledger_rows(status, bounty, link, cells[2].strip(), cells[3].strip(), cells[-1])
+
+    def ledger_rows(self, status, bounty, link, month, date, rewards):
+        head = (self.curr_year, self.curr_chain, STATUS[status], bounty, link, month, date)
+        found = self.rewards(rewards)
+        if len(found) == 0:
+            return [head + (None, 0.0)]
+        return [head + (denom, value) for denom, value in found.items()]
+
+    def parse(self, lines):
+        """
+            Append the bounty rows of `lines` to `rows` and return it.
+            Rows under a year or chain header that is not in setting.yaml are skipped, other
+            ## headings keep the current year
+        """
+        year_match = self.year_re.match
+        chain_match = self.chain_re.match
+        row_match = self.row_re.match
+        status_match = self.status_re.match
+        ledger_rows = self.ledger_rows
+        rows = self.rows
+        for line in lines:
+            if line.startswith('|'):
+                if self.curr_year is None or self.curr_chain is None:
+                    continue
+                m = row_match(line)
+                if m:
+                    status, bounty, link, plain, month, date, rewards = m.groups()
+                    rows.extend(ledger_rows(status, bounty if link is not None else plain, link, month, date, rewards))
+                    continue
+                m = status_match(line)
+                if m:
+                    rows.extend(self.row(line, m.group(1)))
+            elif line.startswith('#'):
+                m = year_match(line)
+                if m:
+                    self.curr_year = self.years.get(m.group(1))
+                    continue
+                m = chain_match(line)
+                if m:
+                    self.curr_chain = m.group(1)
+                elif " Bounties" in line:
+                    self.curr_chain = None
+        return rows
@@ -0,0 +1,79 @@
+"""
+    The JSON API over HTTP against a published snapshot: ETags and 304s, gzip, filters and
+    the 400s of a query it can't answer
+"""
+import gzip, json
+import pandas as pd
+import pytest
+import requests
+from payout import snapshot
+from payout.api import payout_api, api_error
+from payout.manager import snapshot_manager
+
+ROWS = [
+    # Contributor, Year, Blockchain, Tokens, Amount, Price
+    ('alice', 2021, 'SOLANA', 'SOL', 2.0, 10.0),
+    ('alice', 2022, 'SOLANA', 'USDC', 5.0, 1.0),
+    ('bob', 2022, 'NEAR-CHAIN', 'NEAR', 4.0, 2.5),
+    ('bob', 2022, 'SOLANA', 'SOL', 1.0, 10.0),
+]
+FX = {'usd': {'SOL': 1.0, 'USDC': 1.0, 'NEAR': 1.0}, 'eur': {'SOL': 0.5, 'USDC': 0.5, 'NEAR': 0.5}}
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    # snapshot paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame(ROWS, columns=['Contributor', 'Year', 'Blockchain', 'Tokens', 'Amount', 'Price'])
+    snapshot.publish(df.assign(Amount_USD=df['Amount'] * df['Price']), fx=FX)
+    server = payout_api(manager=snapshot_manager(lock_file=str(tmp_path / "ingest.lock"))).serve(port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def get(url, **headers):
+    return requests.get(url, headers={'Accept-Encoding': 'identity', **headers}, timeout=5)
+
+def test_etag(api):
+    found = get(f"{api}/api/totals")
+    assert found.status_code == 200 and found.json()['total'] == 20 + 5 + 10 + 10
+    etag = found.headers['ETag']
+    assert get(f"{api}/api/totals", **{'If-None-Match': etag}).status_code == 304
+    # another query, another tag
+    assert get(f"{api}/api/totals?year=2022", **{'If-None-Match': etag}).status_code == 200
+
+def test_new_version_new_etag(api):
+    etag = get(f"{api}/api/totals").headers['ETag']
+    published = snapshot.manifest()
+    snapshot.publish(snapshot.read(published['file']), fx=published['fx'])
+    found = get(f"{api}/api/totals", **{'If-None-Match': etag})
+    assert found.status_code == 200 and found.json()['version'] == published['version'] + 1
+
+def test_gzip(api):
+    # requests inflates the body itself, the raw stream shows what was sent
+    found = requests.get(f"{api}/api/chains", headers={'Accept-Encoding': 'gzip'}, stream=True, timeout=5)
+    assert found.headers['Content-Encoding'] == 'gzip'
+    raw = found.raw.read(decode_content=False)
+    assert json.loads(gzip.decompress(raw)) == get(f"{api}/api/chains").json()
+    assert 'Content-Encoding' not in get(f"{api}/api/chains").headers
+
+def test_filters(api):
+    found = get(f"{api}/api/totals?year=2022&chain=SOLANA").json()
+    assert found['total'] == 15 and found['by_year'] == {'2022': 15}
+    assert found['by_token'] == {'USDC': 5, 'SOL': 10}
+    found = get(f"{api}/api/chains?token=SOL,NEAR&currency=eur").json()
+    assert found['currency'] == 'EUR'
+    assert {chain['chain']: chain['total'] for chain in found['chains']} == {'SOLANA': 15, 'NEAR-CHAIN': 5}
+    # nothing left after filtering
+    found = get(f"{api}/api/totals?year=2021&chain=NEAR-CHAIN").json()
+    assert found['total'] == 0 and found['by_year'] == {}
+
+@pytest.mark.parametrize('query', ["chain=SOLANNA", "chain=SOLANA,SOLANNA", "year=2030", "chains=SOLANA", "currency=xyz"])
+def test_bad_query(api, query):
+    found = get(f"{api}/api/totals?{query}")
+    assert found.status_code == 400 and 'unknown' in found.json()['error']
+
+def test_no_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(api_error) as found:
+        payout_api(manager=snapshot_manager(lock_file=str(tmp_path / "ingest.lock"))).answer('/api/totals')
+    assert found.value.status == 503
@@ -0,0 +1,79 @@
+"""
+    Rate limits, retries and failover of fetch_scheduler against the fake CoinGecko
+"""
+import time
+import requests
+import pytest
+from bench.fake_coingecko import fake_coingecko, fake_price
+from payout import fetch
+from payout.fetch import fetch_scheduler, shared_bucket
+
+PARAMS = {'vs_currency': 'usd', 'ids': 'solana,near'}
+
+def scheduler(*urls, **kwargs):
+    # no rate limit and short backoffs unless a test asks for them
+    options = {'rate': 1000, 'burst': 1000, 'timeout': 5, 'retries': 3, 'backoff': 0.01, 'hedge': 5, **kwargs}
+    return fetch_scheduler(list(urls), requests.Session(), **options)
+
+def prices(found):
+    return {coin['id']: coin['current_price'] for coin in found}
+
+@pytest.fixture
+def fake():
+    with fake_coingecko() as server:
+        yield server
+
+def test_answer(fake):
+    found = scheduler(fake.url).get("/coins/markets", PARAMS)
+    assert prices(found) == {'solana': fake_price('solana'), 'near': fake_price('near')}
+    assert fake.served == 1
+
+def test_retries():
+    with fake_coingecko(fail_first=2) as fake:
+        found = scheduler(fake.url).get("/coins/markets", PARAMS)
+        assert prices(found)['solana'] == fake_price('solana')
+        assert fake.served == 3
+
+def test_gives_up():
+    with fake_coingecko(rate_429=1.0) as fake:
+        assert scheduler(fake.url, retries=2).get("/coins/markets", PARAMS) is None
+        assert fake.served == 3
+
+def test_retry_after():
+    with fake_coingecko(fail_first=1, retry_after=1) as fake:
+        began = time.monotonic()
+        found = scheduler(fake.url).get("/coins/markets", PARAMS)
+        # the backoff alone would have waited 10ms at most
+        assert time.monotonic() - began >= 1
+        assert found is not None and fake.served == 2
+
+def test_failover():
+    with fake_coingecko(rate_500=1.0) as primary, fake_coingecko() as fallback:
+        found = scheduler(primary.url, fallback.url, retries=1).get("/coins/markets", PARAMS)
+        assert prices(found)['near'] == fake_price('near')
+        assert primary.served == 2 and fallback.served == 1
+
+def test_hedge():
+    # a primary that hasn't answered within `hedge` seconds has the fallback asked too
+    with fake_coingecko(delay=2) as primary, fake_coingecko() as fallback:
+        began = time.monotonic()
+        found = scheduler(primary.url, fallback.url, hedge=0.2).get("/coins/markets", PARAMS)
+        assert found is not None and fallback.served == 1
+        assert time.monotonic() - began < 1.5
+
+def test_rate_limit(fake):
+    # burst of 2, then one request every 0.2s
+    get = scheduler(fake.url, rate=5, burst=2).get
+    began = time.monotonic()
+    for _ in range(4):
+        get("/coins/markets", PARAMS)
+    assert time.monotonic() - began >= 0.35
+
+def test_bucket_follows_setting():
+    url = "http://bucket.test"
+    bucket = shared_bucket(url, rate=1, burst=1)
+    assert shared_bucket(url, rate=1, burst=1) is bucket
+    assert shared_bucket(url, rate=5, burst=3) is bucket
+    assert (bucket.rate, bucket.burst) == (5, 3)
+    assert bucket.tokens <= 3
+    fetch._buckets.pop(url)
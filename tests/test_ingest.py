@@ -0,0 +1,125 @@
+"""
+    The incremental ingest (checkpoints, prefix hashes, spliced rows) must give the ledger a
+    full parse of the same trackers gives
+"""
+import os
+import pandas as pd
+import pytest
+from payout.ingest import incremental_parser, parse_trackers
+
+CHAINS = {'SOLANA': ['SOL', 'USDC'], 'NEAR-CHAIN': ['NEAR']}
+YEARS = [2021, 2022]
+CONFIG = "config-hash"
+
+def section(year, chain, first, rows):
+    lines = [f"## {year} [👑 0 Grand Prize Wins]\n", f"### ⚡ {chain} Bounties\n", "| Check | Bounties | Month | Date | Rewards |\n", "|---|---|---|---|---|\n"]
+    denom = CHAINS[chain][0]
+    for n in range(first, first + rows):
+        mark = "✅" if n % 4 else "❌"
+        lines.append(f"| {mark} | [Bounty {n}](https://app.flipsidecrypto.com/dashboard/b-{n}) | Jan | {n % 28 + 1}/{n % 12 + 1} | {n + 1}.5 {denom} |\n")
+    return ''.join(lines)
+
+def tracker(rows=6):
+    return section(2021, 'SOLANA', 0, rows) + section(2022, 'NEAR-CHAIN', 100, rows) + section(2022, 'SOLANA', 200, rows)
+
+def write(path, text):
+    # a new mtime every time, edits of the same size are seen too
+    before = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(text)
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+def plain(df):
+    # compare values, not the order of categories
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}).reset_index(drop=True)
+
+def assert_same(ledger, full):
+    pd.testing.assert_frame_equal(plain(ledger), plain(full))
+
+class ingest():
+    # parse_trackers with the checkpoints and ledger of the previous call, like payout_calculator
+    def __init__(self):
+        self.checkpoints, self.ledger = dict(), None
+
+    def __call__(self, paths):
+        self.ledger, self.checkpoints, changed = parse_trackers(paths, CHAINS, YEARS, CONFIG, self.checkpoints, lambda: self.ledger, workers=1)
+        return self.ledger, changed
+
+def full(paths):
+    return parse_trackers(paths, CHAINS, YEARS, CONFIG, dict(), lambda: None, workers=1)[0]
+
+def full_file(path):
+    return incremental_parser(CHAINS, YEARS, CONFIG).parse(path)[0]
+
+@pytest.fixture
+def readme(tmp_path):
+    path = str(tmp_path / "README.md")
+    write(path, tracker())
+    return path
+
+def test_append(readme):
+    parser = incremental_parser(CHAINS, YEARS, CONFIG)
+    ledger, cp = parser.parse(readme)
+    write(readme, tracker() + section(2022, 'SOLANA', 300, 3))
+    ledger, cp = parser.parse(readme, cp, lambda: ledger)
+    assert parser.mode == 'append'
+    assert_same(ledger, full_file(readme))
+    ledger, cp = parser.parse(readme, cp, lambda: ledger)
+    assert parser.mode == 'unchanged'
+
+def test_partial_last_line(readme):
+    parser = incremental_parser(CHAINS, YEARS, CONFIG)
+    ledger, cp = parser.parse(readme)
+    row = section(2022, 'SOLANA', 300, 1).splitlines(True)[-1]
+    # the row counts while it is being typed, and is parsed again once it ends in a newline
+    write(readme, tracker() + row[:-8])
+    ledger, cp = parser.parse(readme, cp, lambda: ledger)
+    assert parser.mode == 'append'
+    assert_same(ledger, full_file(readme))
+    write(readme, tracker() + row)
+    ledger, cp = parser.parse(readme, cp, lambda: ledger)
+    assert parser.mode == 'append'
+    assert_same(ledger, full_file(readme))
+
+def test_edit_in_the_middle(readme):
+    parser = incremental_parser(CHAINS, YEARS, CONFIG)
+    ledger, cp = parser.parse(readme)
+    write(readme, tracker().replace("Bounty 101]", "Bounty 101 renamed]").replace("| 102.5 NEAR |", "| 9.5 NEAR |"))
+    ledger, cp = parser.parse(readme, cp, lambda: ledger)
+    assert parser.mode == 'full'
+    assert_same(ledger, full_file(readme))
+
+def test_trackers(tmp_path, readme):
+    alice, bob = str(tmp_path / "alice.md"), str(tmp_path / "bob.md")
+    write(alice, section(2022, 'SOLANA', 500, 4))
+    run = ingest()
+    ledger, changed = run([readme, alice])
+    assert_same(ledger, full([readme, alice]))
+
+    # nothing new: the same ledger, nothing changed
+    same, changed = run([readme, alice])
+    assert not changed and same is ledger
+
+    # one tracker added, another one appended to
+    write(bob, section(2021, 'NEAR-CHAIN', 600, 5))
+    write(alice, section(2022, 'SOLANA', 500, 4) + section(2022, 'NEAR-CHAIN', 700, 2))
+    ledger, changed = run([readme, alice, bob])
+    assert changed
+    assert_same(ledger, full([readme, alice, bob]))
+
+    # one tracker removed, another one edited
+    write(alice, section(2022, 'SOLANA', 500, 2) + section(2022, 'NEAR-CHAIN', 700, 2))
+    ledger, changed = run([alice, bob])
+    assert changed
+    assert_same(ledger, full([alice, bob]))
+    assert set(ledger['Contributor']) == {'alice', 'bob'}
+
+def test_lost_ledger(readme):
+    # checkpoints without the ledger they were made with fall back to a full parse
+    run = ingest()
+    run([readme])
+    write(readme, tracker() + section(2022, 'SOLANA', 300, 3))
+    run.ledger = None
+    ledger, changed = run([readme])
+    assert changed
+    assert_same(ledger, full([readme]))
@@ -0,0 +1,136 @@
+"""
+    snapshot_manager: one ingest in flight, started only when its inputs changed, and the
+    objects built from a snapshot shared by all threads
+"""
+import threading, time
+import pytest
+from payout import snapshot
+from payout.manager import snapshot_manager, file_lock, KEEP
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # snapshot paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return snapshot_manager(lock_file=str(tmp_path / "ingest.lock"))
+
+class slow_job():
+    # an ingest that runs until it is released, counting its runs
+    def __init__(self):
+        self.runs = list()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, name):
+        def job():
+            self.runs.append(name)
+            self.started.set()
+            assert self.release.wait(5)
+        return job
+
+def test_same_stamp_starts_nothing(manager):
+    runs = list()
+    manager.refresh(lambda: runs.append(1), wait=True, stamp='S1')
+    manager.refresh(lambda: runs.append(2), wait=True, stamp='S1')
+    assert runs == [1]
+    manager.refresh(lambda: runs.append(3), wait=True, stamp='S2')
+    assert runs == [1, 3]
+
+def test_stamp_changed_while_running(manager):
+    job = slow_job()
+    manager.refresh(job('S1'), stamp='S1')
+    assert job.started.wait(5)
+    # a tracker edited while S1 runs: S2 runs once S1 is done, within the same background run
+    manager.refresh(job('S2'), stamp='S2')
+    manager.refresh(job('S2'), stamp='S2')
+    job.release.set()
+    manager.refresh(job('S2'), wait=True, stamp='S2')
+    assert job.runs == ['S1', 'S2']
+    manager.refresh(job('S2'), wait=True, stamp='S2')
+    assert job.runs == ['S1', 'S2']
+
+def test_waiters_get_the_newer_run(manager):
+    job = slow_job()
+    manager.refresh(job('S1'), stamp='S1')
+    assert job.started.wait(5)
+    done = threading.Thread(target=lambda: manager.refresh(job('S2'), wait=True, stamp='S2'))
+    done.start()
+    job.release.set()
+    done.join(5)
+    assert job.runs == ['S1', 'S2'] and not manager.refresher.running()
+
+def test_failed_ingest_is_retried(manager):
+    runs = list()
+
+    def failing():
+        runs.append('fail')
+        raise FileNotFoundError("no tracker found at missing.md")
+    refresher = manager.refresh(failing, wait=True, stamp='S1')
+    assert isinstance(refresher.error, FileNotFoundError)
+    # same inputs, but the last run failed: tried again
+    refresher = manager.refresh(lambda: runs.append('ok'), wait=True, stamp='S1')
+    assert runs == ['fail', 'ok'] and refresher.error is None
+
+def test_exclusive(manager):
+    assert manager.exclusive(lambda: 'ran') == 'ran'
+
+def test_exclusive_skips_after_another_publish(manager, monkeypatch):
+    # another process holds the ingest lock and publishes while this one waits for it
+    holding, seen = threading.Event(), threading.Event()
+    version = snapshot.version
+
+    def seeing():
+        found = version()
+        seen.set()
+        return found
+    monkeypatch.setattr(snapshot, 'version', seeing)
+
+    def other_process():
+        with file_lock(manager.lock_file):
+            holding.set()
+            assert seen.wait(5)
+            snapshot.write_json({'version': 1, 'file': snapshot.snapshot_file(1)}, snapshot.MANIFEST_FILE)
+    other = threading.Thread(target=other_process)
+    other.start()
+    assert holding.wait(5)
+    assert manager.exclusive(lambda: 'ran') is None
+    other.join(5)
+
+def test_get_builds_once(manager):
+    builds = list()
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return object()
+    found = list()
+    threads = [threading.Thread(target=lambda: found.append(manager.get(1, 'cube', build))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(builds) == 1 and len(found) == 8 and all(f is found[0] for f in found)
+
+def test_get_other_keys_while_building(manager):
+    release = threading.Event()
+    slow = threading.Thread(target=lambda: manager.get(1, 'slow', lambda: release.wait(5)))
+    slow.start()
+    began = time.monotonic()
+    # an unrelated key, and a builder that gets what it is built from
+    assert manager.get(1, 'fast', lambda: manager.get(1, 'frame', lambda: 'F') + 'C') == 'FC'
+    assert time.monotonic() - began < 1
+    release.set()
+    slow.join(5)
+    assert manager.get(1, 'slow', lambda: False) is True
+
+def test_get_failed_build_is_retried(manager):
+    def failing():
+        raise OSError("snapshot gone")
+    with pytest.raises(OSError):
+        manager.get(1, 'frame', failing)
+    assert manager.get(1, 'frame', lambda: 'F') == 'F'
+
+def test_get_keeps_the_newest_versions(manager):
+    for version in range(1, 5):
+        manager.get(version, 'frame', lambda: version)
+    assert sorted(manager.cache) == list(range(5 - KEEP, 5))
+    assert manager.get(4, 'frame', lambda: 'rebuilt') == 4